@@ -1,12 +1,51 @@
 #!/usr/bin/env python3
 
+import json
+import os
 import sys
 import subprocess
+import time
+from pathlib import Path
 
-def get_connected_outputs():
+try:
+    from Xlib import display as xdisplay
+    from Xlib.ext import randr
+except ImportError:
+    xdisplay = None
+
+CACHE_FILE = Path.home() / ".cache" / "brightshift" / "outputs.json"
+CACHE_TTL = 60
+
+def load_cached_outputs():
+    try:
+        cache = json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+    if cache.get("display") != os.environ.get("DISPLAY"):
+        return None
+    if time.time() - cache.get("mtime", 0) > CACHE_TTL:
+        return None
+    return cache.get("outputs") or None
+
+def save_cached_outputs(outputs: list):
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_FILE.write_text(json.dumps({
+            "display": os.environ.get("DISPLAY"),
+            "mtime": time.time(),
+            "outputs": outputs,
+        }))
+    except OSError:
+        pass
+
+def get_connected_outputs(refresh: bool = False):
+    if not refresh:
+        cached = load_cached_outputs()
+        if cached:
+            return cached
     try:
         xrandr_output = subprocess.check_output(["xrandr", "--current"], text=True)
-        return [
+        outputs = [
             line.split()[0]
             for line in xrandr_output.splitlines()
             if " connected" in line
@@ -14,39 +53,85 @@ def get_connected_outputs():
     except Exception as e:
         print(f"Failed to detect displays: {e}")
         sys.exit(1)
+    save_cached_outputs(outputs)
+    return outputs
 
-def set_brightness(output: str, level: float):
+def set_brightness(outputs: list, level: float):
+    args = ["xrandr"]
+    for output in outputs:
+        args.extend(["--output", output, "--brightness", str(level)])
     try:
-        subprocess.run(["xrandr", "--output", output, "--brightness", str(level)],
-                       check=True)
+        subprocess.run(args, check=True)
     except subprocess.CalledProcessError as e:
-        print(f"Error setting brightness on {output}: {e}")
+        print(f"Error setting brightness on {', '.join(outputs)}: {e}")
+
+def gamma_ramp(size: int, level: float):
+    # Same linear ramp xrandr --brightness builds (gamma 1.0)
+    if size < 2:
+        return [min(65535, int(65535 * level))] * size
+    return [
+        min(65535, int(i / (size - 1) * level * 65535))
+        for i in range(size)
+    ]
+
+def set_brightness_xlib(level: float) -> bool:
+    if xdisplay is None:
+        return False
+    try:
+        d = xdisplay.Display()
+    except Exception:
+        return False
+    try:
+        root = d.screen().root
+        resources = root.xrandr_get_screen_resources_current()
+        crtcs = set()
+        for output in resources.outputs:
+            info = d.xrandr_get_output_info(output, resources.config_timestamp)
+            if info.connection == randr.Connected and info.crtc:
+                crtcs.add(info.crtc)
+        for crtc in crtcs:
+            size = d.xrandr_get_crtc_gamma_size(crtc).size
+            ramp = gamma_ramp(size, level)
+            d.xrandr_set_crtc_gamma(crtc, size, ramp, ramp, ramp)
+        d.sync()
+        return bool(crtcs)
+    except Exception as e:
+        print(f"RandR request failed, falling back to xrandr: {e}")
+        return False
+    finally:
+        d.close()
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: brightshift [night|day|custom <value>]")
+    refresh = "--refresh" in sys.argv
+    argv = [arg for arg in sys.argv if arg != "--refresh"]
+
+    if len(argv) < 2:
+        print("Usage: brightshift [--refresh] [night|day|custom <value>]")
         sys.exit(1)
 
-    command = sys.argv[1].lower()
+    command = argv[1].lower()
 
     if command == "night":
         level = 0.3
     elif command == "day":
         level = 1.0
-    elif command == "custom" and len(sys.argv) == 3:
+    elif command == "custom" and len(argv) == 3:
         try:
-            level = float(sys.argv[2])
+            level = float(argv[2])
         except ValueError:
             print("custom value must be a float (e.g., 0.5)")
             sys.exit(1)
     else:
         print("Invalid command.")
-        print("Usage: brightshift [night|day|custom <value>]")
+        print("Usage: brightshift [--refresh] [night|day|custom <value>]")
         sys.exit(1)
 
-    outputs = get_connected_outputs()
-    for output in outputs:
-        set_brightness(output, level)
+    if set_brightness_xlib(level):
+        return
+
+    outputs = get_connected_outputs(refresh)
+    if outputs:
+        set_brightness(outputs, level)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,9 +3,10 @@
 import os
 import sys
 import subprocess
-import tempfile
 import time
 
+from dictate.daemon import get_model_path, request_transcription
+
 def notify(title, message, timeout=2000):
     """Send desktop notification"""
     try:
@@ -35,11 +36,16 @@ def start_recording(pid_file, audio_file):
     print("Recording... (run again to stop)")
     notify("Whisper Dictation", "Recording started. Run again to stop.")
 
-    # Record from default microphone using parec piped to sox
-    # parec captures from mic, sox converts to proper WAV format
+    # Record from default microphone straight to WAV with parecord
     # Start in a new process group to safely kill it later
-    cmd = f"parec --format=s16le --rate=16000 --channels=1 | sox -t raw -r 16000 -e signed -b 16 -c 1 - {audio_file}"
-    proc = subprocess.Popen(cmd, shell=True, start_new_session=True)
+    proc = subprocess.Popen([
+        "parecord",
+        "--format=s16le",
+        "--rate=16000",
+        "--channels=1",
+        "--file-format=wav",
+        audio_file
+    ], start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
     # Save PID
     with open(pid_file, 'w') as f:
@@ -47,8 +53,25 @@ def start_recording(pid_file, audio_file):
 
     print(f"Recording PID: {proc.pid}")
 
+def transcribe_once(audio_file, model, language):
+    """Transcribe with a one-off whisper.cpp process"""
+    result = subprocess.run([
+        "whisper-cpp",
+        "-m", get_model_path(model),
+        "-l", language,
+        "-nt",
+        "-np",
+        "-f", audio_file
+    ], capture_output=True, text=True)
+
+    if result.returncode != 0:
+        raise RuntimeError(f"whisper-cpp failed: {result.stderr.strip()}")
+
+    # whisper.cpp prints the transcription to stdout
+    return " ".join(line.strip() for line in result.stdout.splitlines() if line.strip())
+
 def stop_recording_and_transcribe(pid, pid_file, model="base", language="en"):
-    """Stop recording and transcribe with Whisper"""
+    """Stop recording and transcribe with whisper.cpp"""
     audio_file = "/tmp/whisper-dictate.wav"
 
     # Stop the recording process
@@ -57,7 +80,7 @@ def stop_recording_and_transcribe(pid, pid_file, model="base", language="en"):
     try:
         # Send SIGTERM to the process group to allow graceful shutdown
         os.killpg(pid, 15)  # SIGTERM to process group
-        time.sleep(1.5)  # Give sox time to finalize the WAV file
+        time.sleep(1.5)  # Give parecord time to finalize the WAV file
     except:
         # Fallback to killing just the PID
         try:
@@ -76,46 +99,30 @@ def stop_recording_and_transcribe(pid, pid_file, model="base", language="en"):
         notify("Whisper Dictation", "No audio recorded.")
         return
 
-    # Transcribe with Whisper
+    # Transcribe with whisper.cpp using a quantized GGML model
     print("Transcribing with Whisper...")
     notify("Whisper Dictation", "Transcribing...")
 
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            result = subprocess.run([
-                "whisper", audio_file,
-                "--model", model,
-                "--language", language,
-                "--task", "transcribe",
-                "--output_format", "txt",
-                "--output_dir", tmpdir,
-                "--fp16", "False"
-            ], capture_output=True, text=True)
-
-            # Read transcribed text
-            # Whisper creates a file named after the input file
-            txt_file = os.path.join(tmpdir, os.path.basename(audio_file).replace('.wav', '.txt'))
-            if os.path.exists(txt_file):
-                with open(txt_file, 'r') as f:
-                    text = f.read().strip()
-
-                if text:
-                    print(f"Typing: {text}")
-                    notify("Whisper Dictation", "Typing text...")
-
-                    # Wait a moment for window focus
-                    time.sleep(0.3)
-
-                    # Type the text using xdotool
-                    subprocess.run(["xdotool", "type", "--delay", "10", text], check=True)
-
-                    print("Done!")
-                else:
-                    print("No text transcribed.")
-                    notify("Whisper Dictation", "No text transcribed.")
-            else:
-                print("Transcription failed.")
-                notify("Whisper Dictation", "Transcription failed.")
+        # Prefer the resident daemon; fall back to a one-shot whisper.cpp run
+        text = request_transcription(audio_file, model, language)
+        if text is None:
+            text = transcribe_once(audio_file, model, language)
+
+        if text:
+            print(f"Typing: {text}")
+            notify("Whisper Dictation", "Typing text...")
+
+            # Wait a moment for window focus
+            time.sleep(0.3)
+
+            # Type the text using xdotool
+            subprocess.run(["xdotool", "type", "--delay", "10", text], check=True)
+
+            print("Done!")
+        else:
+            print("No text transcribed.")
+            notify("Whisper Dictation", "No text transcribed.")
     except Exception as e:
         print(f"Error during transcription: {e}")
         notify("Whisper Dictation", f"Error: {e}")
@@ -132,7 +139,8 @@ def main():
     if len(sys.argv) > 1:
         if sys.argv[1] in ["--help", "-h"]:
             print("Usage: dictate [MODEL] [LANGUAGE]")
-            print("  MODEL: tiny, base, small, medium, large (default: base)")
+            print("  MODEL: tiny, base, small, medium, large (default: medium)")
+            print("         loaded from ~/.cache/whisper/ggml-MODEL-q5_0.bin")
             print("  LANGUAGE: language code (default: en)")
             print("\nRun once to start recording, run again to stop and transcribe.")
             sys.exit(0)
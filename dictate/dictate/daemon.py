@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import socket
+import sys
+
+def get_socket_path():
+    """Path of the daemon's unix socket"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.path.expanduser("~/.run")
+    return os.path.join(runtime_dir, "dictate.sock")
+
+def get_model_path(model):
+    """Path of the quantized GGML model for a model name"""
+    return os.path.expanduser(f"~/.cache/whisper/ggml-{model}-q5_0.bin")
+
+def request_transcription(audio_file, model, language, timeout=300):
+    """Ask a running daemon to transcribe audio_file.
+
+    Returns None if no daemon is listening, so callers can fall back.
+    """
+    request = {
+        "cmd": "transcribe",
+        "path": audio_file,
+        "model": model,
+        "language": language
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(get_socket_path())
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("r") as f:
+                response = json.loads(f.readline())
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response.get("text", "")
+
+class Transcriber:
+    """Keeps whisper.cpp models resident between requests"""
+
+    def __init__(self):
+        self.models = {}
+
+    def get_model(self, model):
+        if model not in self.models:
+            from pywhispercpp.model import Model
+
+            print(f"Loading model {model}...")
+            self.models[model] = Model(get_model_path(model))
+        return self.models[model]
+
+    def transcribe(self, audio_file, model, language):
+        segments = self.get_model(model).transcribe(audio_file, language=language)
+        return " ".join(segment.text.strip() for segment in segments if segment.text.strip())
+
+def handle_connection(conn, transcriber):
+    with conn, conn.makefile("rwb") as f:
+        try:
+            request = json.loads(f.readline())
+            if request.get("cmd") != "transcribe":
+                raise ValueError(f"Unknown command: {request.get('cmd')}")
+            text = transcriber.transcribe(
+                request["path"],
+                request.get("model", "medium"),
+                request.get("language", "en")
+            )
+            response = {"text": text}
+        except Exception as e:
+            response = {"error": str(e)}
+        f.write(json.dumps(response).encode() + b"\n")
+        f.flush()
+
+def main():
+    preload = sys.argv[1] if len(sys.argv) > 1 else "medium"
+
+    transcriber = Transcriber()
+    transcriber.get_model(preload)
+
+    socket_path = get_socket_path()
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server.listen(1)
+        print(f"Listening on {socket_path}")
+
+        try:
+            while True:
+                conn, _ = server.accept()
+                handle_connection(conn, transcriber)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+if __name__ == "__main__":
+    main()
@@ -2,29 +2,45 @@
 
 import os
 import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+def move_prefix(prefix_dir: Path, new_location: Path):
+    if os.stat(prefix_dir).st_dev == os.stat(new_location.parent).st_dev:
+        # Same filesystem: a single directory entry rename
+        os.rename(prefix_dir, new_location)
+        return
+
+    # Cross-filesystem: let cp use reflinks / copy_file_range instead of a Python copytree
+    subprocess.run(["cp", "-a", "--reflink=auto", str(prefix_dir), str(new_location)],
+                   check=True)
+    shutil.rmtree(prefix_dir)
+
+def move_one(prefix_dir: Path, new_compatdata_root: Path):
+    appid = prefix_dir.name
+    new_location = new_compatdata_root / appid
+
+    if prefix_dir.is_symlink():
+        print(f"[SKIP] {appid} is already a symlink.")
+        return
+    if new_location.exists():
+        print(f"[SKIP] {appid} already exists at new location.")
+        return
+
+    print(f"[MOVE] {appid} -> {new_location}")
+    move_prefix(prefix_dir, new_location)
+    os.symlink(str(new_location), str(prefix_dir))
+
 def main():
     original_compatdata = Path("/mnt/games/Games/Steam/steamapps/compatdata")
     new_compatdata_root = Path.home() / "SteamCompatData"
 
     new_compatdata_root.mkdir(parents=True, exist_ok=True)
 
-    for prefix_dir in original_compatdata.iterdir():
-        if prefix_dir.is_dir():
-            appid = prefix_dir.name
-            new_location = new_compatdata_root / appid
-
-            if prefix_dir.is_symlink():
-                print(f"[SKIP] {appid} is already a symlink.")
-                continue
-            if new_location.exists():
-                print(f"[SKIP] {appid} already exists at new location.")
-                continue
-
-            print(f"[MOVE] {appid} -> {new_location}")
-            shutil.move(str(prefix_dir), str(new_location))
-            os.symlink(str(new_location), str(prefix_dir))
+    prefixes = [d for d in original_compatdata.iterdir() if d.is_dir()]
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as ex:
+        list(ex.map(lambda d: move_one(d, new_compatdata_root), prefixes))
 
     print("Done.")
 
@@ -3,16 +3,26 @@
 import subprocess
 import re
 
+KERNEL_VERSION_RE = re.compile(r"-(\d+\.\d+\.\d+-\d+)")
+
 def get_installed_kernels():
+    # dpkg-query filters by package name itself; a pattern with no match
+    # makes it exit non-zero, so don't use check=True here
     result = subprocess.run(
-        ["dpkg", "--list"], stdout=subprocess.PIPE, text=True, check=True
+        [
+            "dpkg-query", "-W", "-f=${db:Status-Abbrev} ${Package}\n",
+            "linux-image-[0-9]*",
+            "linux-headers-[0-9]*",
+            "linux-modules-[0-9]*",
+            "linux-modules-extra-[0-9]*",
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
     )
     kernel_packages = []
     for line in result.stdout.splitlines():
-        if re.search(r"linux-(image|headers|modules)(-extra)?-[\d]", line):
-            parts = line.split()
-            if parts and parts[0] == "ii":
-                kernel_packages.append(parts[1])
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == "ii":
+            kernel_packages.append(parts[1])
     return kernel_packages
 
 def get_current_kernel():
@@ -21,12 +31,12 @@ def get_current_kernel():
 def extract_kernel_versions(packages):
     versions = set()
     for pkg in packages:
-        match = re.search(r"-(\d+\.\d+\.\d+-\d+)", pkg)
+        match = KERNEL_VERSION_RE.search(pkg)
         if match:
             versions.add(match.group(1))
-    return sorted(versions, key=lambda v: list(map(int, re.findall(r'\d+', v))))
+    return sorted(versions, key=lambda v: tuple(int(p) for p in v.replace("-", ".").split(".")))
 
-def remove_kernel(version):
+def get_removal_targets(version, installed):
     targets = [
         f"linux-image-{version}-generic",
         f"linux-headers-{version}",
@@ -36,20 +46,17 @@ def remove_kernel(version):
         f"linux-tools-{version}",
     ]
 
-    installed = get_installed_kernels()
     to_remove = [pkg for pkg in targets if pkg in installed]
 
-    if to_remove:
-        print(f"\n🔧 Removing kernel version {version}:")
-        subprocess.run(["sudo", "apt", "remove", "-y"] + to_remove)
-    else:
+    if not to_remove:
         print(f"\nℹ️  No packages found to remove for version {version}.")
+    return to_remove
 
 def main():
     print("🔍 Detecting installed kernel packages...")
     current_kernel = get_current_kernel()
     current_version = current_kernel.split("-generic")[0]
-    installed = get_installed_kernels()
+    installed = set(get_installed_kernels())
     versions = extract_kernel_versions(installed)
 
     print(f"\n🟢 Currently running kernel: {current_kernel}")
@@ -63,15 +70,19 @@ def main():
     print(f"\n✅ Keeping versions: {', '.join(sorted(keep))}")
     print("🗑️  Preparing to remove:")
 
-    removed_any = False
+    all_targets = []
     for version in versions:
         if version not in keep:
             print(f" - {version}")
-            remove_kernel(version)
-            removed_any = True
+            all_targets.extend(get_removal_targets(version, installed))
 
-    if not removed_any:
+    if not all_targets:
         print("\n🎉 No old kernels to remove. System is already clean.")
+        return
+
+    # One apt run so initramfs/grub triggers only fire once
+    print(f"\n🔧 Removing {len(all_targets)} packages:")
+    subprocess.run(["sudo", "apt", "remove", "-y"] + all_targets)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,8 +3,11 @@
 import os
 import sys
 import json
+import hashlib
 import subprocess
+import time
 import requests
+from packaging.version import InvalidVersion, Version
 from pathlib import Path
 
 
@@ -14,6 +17,7 @@ APP_NAME = "meshchat"
 CONFIG_DIR = Path.home() / ".config" / APP_NAME
 IMAGES_DIR = CONFIG_DIR / "images"
 VERSION_FILE = CONFIG_DIR / "current_version.json"
+RELEASE_CHECK_TTL = 3600
 
 
 def ensure_dirs():
@@ -21,36 +25,98 @@ def ensure_dirs():
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def get_current_version():
-    """Read current installed version from file"""
+def load_version_data():
+    """Read the version file, returning an empty dict if missing or invalid"""
     if not VERSION_FILE.exists():
-        return None
+        return {}
     try:
         with open(VERSION_FILE, 'r') as f:
-            data = json.load(f)
-            return data.get('version')
+            return json.load(f)
     except Exception as e:
         print(f"⚠️  Error reading version file: {e}")
-        return None
+        return {}
 
 
-def save_current_version(version, appimage_path):
-    """Save current version to file"""
+def save_version_data(data):
+    """Write the version file"""
     try:
         with open(VERSION_FILE, 'w') as f:
-            json.dump({
-                'version': version,
-                'appimage_path': str(appimage_path)
-            }, f, indent=2)
+            json.dump(data, f, indent=2)
     except Exception as e:
         print(f"⚠️  Error saving version file: {e}")
 
 
+def get_current_version():
+    """Read current installed version from file"""
+    return load_version_data().get('version')
+
+
+def save_current_version(version, appimage_path, sha256):
+    """Save current version to file"""
+    data = load_version_data()
+    data['version'] = version
+    data['appimage_path'] = str(appimage_path)
+    data['sha256'] = sha256
+    # Remember what the verified file looked like so later launches can skip re-hashing it
+    st = Path(appimage_path).stat()
+    data['size'] = st.st_size
+    data['mtime_ns'] = st.st_mtime_ns
+    save_version_data(data)
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, hashed in C where available"""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+        return digest.hexdigest()
+
+
+def get_expected_sha256(url):
+    """Fetch the digest from a release's .sha256 sidecar asset"""
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        return response.text.split()[0].lower()
+    except (requests.RequestException, IndexError) as e:
+        print(f"⚠️  Could not fetch checksum: {e}")
+        return None
+
+
+def save_release_cache(latest, etag):
+    """Remember the latest release info and its ETag for conditional requests"""
+    data = load_version_data()
+    data['latest'] = latest
+    data['etag'] = etag
+    data['checked_at'] = time.time()
+    save_version_data(data)
+
+
 def get_latest_release():
     """Fetch latest release info from GitHub API"""
+    cached = load_version_data()
+    cached_latest = cached.get('latest')
+
+    # Skip the request entirely if we checked recently
+    if cached_latest and time.time() - cached.get('checked_at', 0) < RELEASE_CHECK_TTL:
+        return cached_latest
+
     api_url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases/latest"
+    headers = {}
+    if cached_latest and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+
     try:
-        response = requests.get(api_url, timeout=10)
+        response = requests.get(api_url, headers=headers, timeout=10)
+
+        # 304 responses don't count against the GitHub rate limit
+        if response.status_code == 304 and cached_latest:
+            save_release_cache(cached_latest, cached.get('etag'))
+            return cached_latest
+
         response.raise_for_status()
         data = response.json()
 
@@ -58,58 +124,96 @@ def get_latest_release():
         tag_name = data.get('tag_name', '')
         version = tag_name.lstrip('v')
 
-        # Find the AppImage asset
+        # Find the AppImage asset and its optional checksum sidecar
         appimage_url = None
+        sha256_url = None
         for asset in data.get('assets', []):
-            if asset.get('name', '').endswith('.AppImage'):
+            name = asset.get('name', '')
+            if name.endswith('.AppImage') and not appimage_url:
                 appimage_url = asset.get('browser_download_url')
-                break
+            elif name.endswith('.AppImage.sha256'):
+                sha256_url = asset.get('browser_download_url')
 
         if not appimage_url:
             print("❌ No AppImage found in latest release")
             return None
 
-        return {
+        latest = {
             'version': version,
             'tag_name': tag_name,
             'url': appimage_url,
+            'sha256_url': sha256_url,
             'filename': os.path.basename(appimage_url)
         }
+        save_release_cache(latest, response.headers.get('ETag'))
+        return latest
     except requests.RequestException as e:
         print(f"❌ Error fetching release info: {e}")
         return None
 
 
-def download_appimage(url, dest_path):
-    """Download AppImage file"""
+def download_appimage(url, dest_path, expected_sha256=None):
+    """Download AppImage file, resuming a previous partial download if present.
+
+    Returns the SHA-256 of the downloaded file, or None on failure.
+    """
     print(f"📥 Downloading {url}...")
+    part_path = dest_path.with_name(dest_path.name + '.part')
     try:
-        response = requests.get(url, stream=True, timeout=30)
+        resume_from = part_path.stat().st_size if part_path.exists() else 0
+        headers = {'Range': f'bytes={resume_from}-'} if resume_from else {}
+        response = requests.get(url, headers=headers, stream=True, timeout=30)
+
+        if response.status_code == 416:
+            # Partial file is stale or already complete on a changed asset; start over
+            part_path.unlink()
+            resume_from = 0
+            response = requests.get(url, stream=True, timeout=30)
+
         response.raise_for_status()
 
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+        if response.status_code == 206:
+            print(f"  Resuming from {resume_from / (1024 * 1024):.1f} MB")
+            mode = 'ab'
+        else:
+            resume_from = 0
+            mode = 'wb'
 
-        with open(dest_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+        total_size = int(response.headers.get('content-length', 0)) + resume_from
+        downloaded = resume_from
+        last_print = 0
+
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
                 if chunk:
                     f.write(chunk)
                     downloaded += len(chunk)
-                    if total_size > 0:
+                    now = time.monotonic()
+                    if total_size > 0 and now - last_print > 0.25:
+                        last_print = now
                         percent = (downloaded / total_size) * 100
                         print(f"\r  Progress: {percent:.1f}%", end='', flush=True)
 
+        if total_size > 0:
+            print("\r  Progress: 100.0%", end='')
         print()  # New line after progress
+
+        sha256 = file_sha256(part_path)
+        if expected_sha256 and sha256 != expected_sha256:
+            print(f"❌ Checksum mismatch (expected {expected_sha256}, got {sha256})")
+            part_path.unlink()
+            return None
+
+        part_path.replace(dest_path)
         print(f"✅ Downloaded to {dest_path}")
 
         # Make executable
         os.chmod(dest_path, 0o755)
-        return True
+        return sha256
     except Exception as e:
+        # Keep the partial file so the next run can resume it
         print(f"❌ Error downloading: {e}")
-        if dest_path.exists():
-            dest_path.unlink()
-        return False
+        return None
 
 
 def run_appimage(appimage_path):
@@ -135,27 +239,13 @@ def run_appimage(appimage_path):
         return False
 
 
-def version_compare(v1, v2):
-    """Compare two version strings (e.g., '2.2.1' vs '2.2.0')"""
+def is_newer_version(latest, current):
+    """Return True if the latest version string is newer than the current one"""
     try:
-        parts1 = [int(x) for x in v1.split('.')]
-        parts2 = [int(x) for x in v2.split('.')]
-
-        # Pad to same length
-        max_len = max(len(parts1), len(parts2))
-        parts1 += [0] * (max_len - len(parts1))
-        parts2 += [0] * (max_len - len(parts2))
-
-        # Compare
-        for p1, p2 in zip(parts1, parts2):
-            if p1 > p2:
-                return 1
-            elif p1 < p2:
-                return -1
-        return 0
-    except Exception:
-        # If comparison fails, assume different
-        return -1 if v1 != v2 else 0
+        return Version(latest) > Version(current)
+    except InvalidVersion:
+        # Unparseable tag; treat any change as an update
+        return latest != current
 
 
 def main():
@@ -176,19 +266,12 @@ def main():
         print("❌ Could not fetch release information")
         # Try to run existing version if available
         if current_version:
-            version_data_path = VERSION_FILE
-            if version_data_path.exists():
-                try:
-                    with open(version_data_path, 'r') as f:
-                        data = json.load(f)
-                        appimage_path = Path(data.get('appimage_path', ''))
-                        if appimage_path.exists():
-                            print("⚠️  Running existing version...")
-                            run_appimage(appimage_path)
-                        else:
-                            print("❌ Existing AppImage not found")
-                except Exception:
-                    pass
+            appimage_path = load_version_data().get('appimage_path')
+            if appimage_path and Path(appimage_path).exists():
+                print("⚠️  Running existing version...")
+                run_appimage(Path(appimage_path))
+            else:
+                print("❌ Existing AppImage not found")
         sys.exit(1)
 
     latest_version = latest['version']
@@ -199,19 +282,41 @@ def main():
     if not current_version:
         print("📥 First-time installation")
         needs_download = True
-    elif version_compare(latest_version, current_version) > 0:
+    elif is_newer_version(latest_version, current_version):
         print(f"⬆️  Newer version available: {current_version} -> {latest_version}")
         needs_download = True
     else:
         print("✅ Already up to date")
 
-    # Download if needed
     appimage_path = IMAGES_DIR / latest['filename']
+
+    # Make sure the installed AppImage is intact before launching it
+    if not needs_download:
+        data = load_version_data()
+        stored_sha256 = data.get('sha256')
+        if not appimage_path.exists():
+            print("📥 Installed AppImage missing, re-downloading")
+            needs_download = True
+        elif stored_sha256:
+            # Only re-hash when the file changed since it was last verified
+            st = appimage_path.stat()
+            if (st.st_size, st.st_mtime_ns) != (data.get('size'), data.get('mtime_ns')):
+                if file_sha256(appimage_path) != stored_sha256:
+                    print("📥 Installed AppImage failed verification, re-downloading")
+                    needs_download = True
+                else:
+                    save_current_version(current_version, appimage_path, stored_sha256)
+
+    # Download if needed
     if needs_download:
-        if not download_appimage(latest['url'], appimage_path):
+        expected_sha256 = None
+        if latest.get('sha256_url'):
+            expected_sha256 = get_expected_sha256(latest['sha256_url'])
+        sha256 = download_appimage(latest['url'], appimage_path, expected_sha256)
+        if not sha256:
             print("❌ Download failed")
             sys.exit(1)
-        save_current_version(latest_version, appimage_path)
+        save_current_version(latest_version, appimage_path, sha256)
 
     # Run the AppImage
     print(f"🚀 Launching {APP_NAME}...")
@@ -2,42 +2,65 @@
 
 import subprocess
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from colorama import Fore, Style, init
-from typing import Optional
+from mutagen import File as MutagenFile
+from typing import List, Optional
 
 init(autoreset=True)
 
 MAX_SIZE_MB = 200
 MIN_BITRATE = 192
 BITRATE_STEP = 16
-VBR_PRIORITY = [0, 1, 2, 3, 4]
 CBR_STEPS = [320, 288, 256, 240, 224, 208, 192]
+SIZE_SAFETY = 0.97
 
 def get_bitrate_kbps(filepath: Path) -> Optional[int]:
     try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-select_streams", "a:0",
-             "-show_entries", "stream=bit_rate", "-of", "default=noprint_wrappers=1:nokey=1", str(filepath)],
-            capture_output=True, text=True, check=True
-        )
-        bitrate = int(float(result.stdout.strip()) / 1000)
-        return bitrate
+        audio = MutagenFile(filepath)
+        bitrate = getattr(audio.info, "bitrate", None) if audio else None
+        return int(bitrate / 1000) if bitrate else None
     except Exception:
         return None
 
-def get_filesize_mb(filepath: Path) -> float:
-    return filepath.stat().st_size / 1024 / 1024
+def pick_cbr_step(target_kbps: float, ceiling: int, below: Optional[int] = None) -> Optional[int]:
+    # Highest CBR step at or under the target (floored at MIN_BITRATE), never above `ceiling`
+    # (the source bitrate) and strictly under `below`; None if no step qualifies
+    target_kbps = max(target_kbps, MIN_BITRATE)
+    for step in CBR_STEPS:
+        if step <= target_kbps and step <= ceiling and (below is None or step < below) and step >= MIN_BITRATE:
+            return step
+    return None
+
+def get_filesize_mb(size_bytes: int) -> float:
+    return size_bytes / 1024 / 1024
+
+@lru_cache(maxsize=None)
+def has_fdk_aac() -> bool:
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                capture_output=True, text=True, check=True)
+        return "libfdk_aac" in result.stdout
+    except Exception:
+        return False
 
 def reencode_file(source: Path, target: Path, bitrate: Optional[int] = None, vbr_quality: Optional[int] = None, verbose: bool = False):
     ext = target.suffix.lower()
-    codec = "libmp3lame" if ext == ".mp3" else "aac"
+    if ext == ".mp3":
+        codec = "libmp3lame"
+    else:
+        codec = "libfdk_aac" if has_fdk_aac() else "aac"
     cmd = ["ffmpeg", "-hide_banner"]
     if verbose:
         cmd += ["-loglevel", "error"]
     else:
         cmd += ["-loglevel", "quiet"]
-    cmd += ["-i", str(source), "-vn", "-map_metadata", "-1", "-c:a", codec]
+    # One encoder thread per job; the process pool already spreads files across cores
+    cmd += ["-i", str(source), "-vn", "-map_metadata", "-1", "-c:a", codec, "-threads", "1"]
+    if codec == "libmp3lame":
+        cmd += ["-compression_level", "7"]
     if vbr_quality is not None:
         cmd += ["-q:a", str(vbr_quality)]
     elif bitrate is not None:
@@ -46,63 +69,92 @@ def reencode_file(source: Path, target: Path, bitrate: Optional[int] = None, vbr
 
     subprocess.run(cmd, check=True)
 
-def main():
-    for ext in ("*.mp3", "*.m4a"):
-        for filepath in Path().glob(ext):
-            if not filepath.is_file() or filepath.name.startswith("OLD."):
-                continue
+def process_file(filepath: Path, size_bytes: int) -> List[str]:
+    # Runs in a worker process; collect output so files don't interleave
+    log = []
 
-            size_mb = get_filesize_mb(filepath)
-            original_bitrate = get_bitrate_kbps(filepath)
+    size_mb = get_filesize_mb(size_bytes)
+    original_bitrate = get_bitrate_kbps(filepath)
 
-            print(f"{Style.BRIGHT}\n📦  {filepath.name}")
-            print(f"    {Style.DIM}├─ Size:     {size_mb:.2f} MB")
-            if original_bitrate:
-                print(f"    {Style.DIM}├─ Bitrate:  {original_bitrate} kbps")
-            else:
-                print(f"    {Style.DIM}├─ Bitrate:  unknown")
+    log.append(f"{Style.BRIGHT}\n📦  {filepath.name}")
+    log.append(f"    {Style.DIM}├─ Size:     {size_mb:.2f} MB")
+    if original_bitrate:
+        log.append(f"    {Style.DIM}├─ Bitrate:  {original_bitrate} kbps")
+    else:
+        log.append(f"    {Style.DIM}├─ Bitrate:  unknown")
+
+    if size_mb < MAX_SIZE_MB:
+        log.append(f"    {Fore.GREEN}✔ Skipping (under 200MB)")
+        return log
+
+    if original_bitrate is None:
+        log.append(f"    {Fore.RED}✘ Could not get bitrate, skipping")
+        return log
+
+    # Output size is close to linear in bitrate, so aim straight for the target
+    est_target_bitrate = original_bitrate * (MAX_SIZE_MB / size_mb) * SIZE_SAFETY
+    bitrate = pick_cbr_step(est_target_bitrate, original_bitrate)
+
+    log.append(f"    {Style.DIM}├─ Target:   under {MAX_SIZE_MB} MB (min {MIN_BITRATE} kbps)")
+    log.append(f"    {Style.DIM}├─ Estimated acceptable CBR bitrate: {int(est_target_bitrate)} kbps")
+
+    if bitrate is None:
+        # Re-encoding at or above the source bitrate can't make the file smaller
+        log.append(f"    {Fore.RED}✘ Source bitrate is already below {MIN_BITRATE} kbps, skipping")
+        return log
+
+    temp_output = filepath.with_name(f"TEMP.{filepath.name}")
+    success = False
+    for attempt in range(2):
+        label = f"{bitrate} kbps"
+        try:
+            log.append(f"    {Fore.CYAN}▶ Trying {label} ...")
+            reencode_file(filepath, temp_output, bitrate, verbose=attempt == 0)
+        except Exception:
+            temp_output.unlink(missing_ok=True)
+            log.append(f"    {Fore.RED}✘ ffmpeg failed for {label}")
+            break
+
+        result_size = get_filesize_mb(temp_output.stat().st_size)
+        size_report = f"→ Result: {result_size:.2f} MB"
+        if result_size < MAX_SIZE_MB:
+            log.append(f"    {Fore.GREEN}{size_report} ✅ success — replacing original")
+            backup = filepath.with_name(f"OLD.{filepath.name}")
+            os.rename(filepath, backup)
+            os.rename(temp_output, filepath)
+            success = True
+            break
+
+        log.append(f"    {Fore.YELLOW}{size_report} ❌ too large")
+        temp_output.unlink(missing_ok=True)
+
+        # One corrected retry, scaled by how far off the first encode was
+        bitrate = pick_cbr_step(bitrate * (MAX_SIZE_MB / result_size) * SIZE_SAFETY, original_bitrate, below=bitrate)
+        if bitrate is None:
+            break
+
+    if not success:
+        log.append(f"    {Fore.RED}❌ Could not reduce below {MAX_SIZE_MB} MB with acceptable quality")
+
+    return log
 
-            if size_mb < MAX_SIZE_MB:
-                print(f"    {Fore.GREEN}✔ Skipping (under 200MB)")
+def main():
+    # scandir entries carry their stat result, so each file is stat'ed once
+    files = []
+    sizes = []
+    with os.scandir(".") as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith((".mp3", ".m4a")) or entry.name.startswith("OLD."):
                 continue
-
-            if original_bitrate is None:
-                print(f"    {Fore.RED}✘ Could not get bitrate, skipping")
+            if not entry.is_file():
                 continue
+            files.append(Path(entry.name))
+            sizes.append(entry.stat().st_size)
 
-            est_target_bitrate = int(original_bitrate * (MAX_SIZE_MB / size_mb))
-            trial_bitrate = max(est_target_bitrate, MIN_BITRATE)
-
-            print(f"    {Style.DIM}├─ Target:   under {MAX_SIZE_MB} MB (min {MIN_BITRATE} kbps)")
-            print(f"    {Style.DIM}├─ Estimated acceptable CBR bitrate: {trial_bitrate} kbps")
-
-            attempts = [(None, vbr) for vbr in VBR_PRIORITY]
-            attempts += [(b, None) for b in CBR_STEPS if b <= original_bitrate and b >= MIN_BITRATE and b <= trial_bitrate]
-
-            for i, (bitrate, vbr_quality) in enumerate(attempts):
-                temp_output = filepath.with_name(f"TEMP.{filepath.name}")
-                label = f"{bitrate} kbps" if bitrate else f"VBR q={vbr_quality}"
-                verbose = i == 0
-                try:
-                    print(f"    {Fore.CYAN}▶ Trying {label} ...")
-                    reencode_file(filepath, temp_output, bitrate, vbr_quality, verbose=verbose)
-
-                    result_size = get_filesize_mb(temp_output)
-                    size_report = f"→ Result: {result_size:.2f} MB"
-                    if result_size < MAX_SIZE_MB:
-                        print(f"    {Fore.GREEN}{size_report} ✅ success — replacing original")
-                        backup = filepath.with_name(f"OLD.{filepath.name}")
-                        os.rename(filepath, backup)
-                        os.rename(temp_output, filepath)
-                        break
-                    else:
-                        print(f"    {Fore.YELLOW}{size_report} ❌ too large")
-                        temp_output.unlink(missing_ok=True)
-                except Exception:
-                    temp_output.unlink(missing_ok=True)
-                    print(f"    {Fore.RED}✘ ffmpeg failed for {label}")
-            else:
-                print(f"    {Fore.RED}❌ Could not reduce below {MAX_SIZE_MB} MB with acceptable quality")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for log in ex.map(process_file, files, sizes):
+            for line in log:
+                print(line)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,23 +1,75 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import hashlib
 import os
+import re
+import shutil
 import sys
+import sqlite3
 import subprocess
+import time
 import json
-from datetime import datetime, date
-from openai import OpenAI
-import pytz
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 import cv2
 import numpy as np
-from PIL import Image
 
+try:
+    import pybase64 as base64  # SIMD-accelerated decoder
+except ImportError:
+    import base64
 
+# Let OpenCV's codecs and resize use every core
+cv2.setNumThreads(os.cpu_count() or 1)
+cv2.setUseOptimized(True)
+
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+
+API_KEY_FILE = os.path.expanduser("~/.openai_api_key")
 CONFIG_DIR = os.path.expanduser("~/.config/wallpapergenerator")
 DAILY_PROMPT_FILE = os.path.join(CONFIG_DIR, "daily_prompt.json")
 HISTORY_FILE = os.path.join(CONFIG_DIR, "history.json")
+HISTORY_JSONL = os.path.join(CONFIG_DIR, "history.jsonl")
+STATE_DB_FILE = os.path.join(CONFIG_DIR, "state.db")
 LOCATION_FILE = os.path.join(CONFIG_DIR, "location.json")
 THEME_HISTORY_FILE = os.path.join(CONFIG_DIR, "theme_history.txt")
+MODEL_CACHE_DIR = os.path.expanduser("~/.cache/wallpapergenerator")
+REALESRGAN_MODEL_URL = "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.0/RealESRGAN_x4plus.pth"
+
+# Anything that isn't a word character, space or hyphen gets dropped from filenames
+UNSAFE_FILENAME_CHARS = re.compile(r"[^\w \-]")
+LOCAL_TZ = ZoneInfo("America/New_York")
+WEATHER_CACHE_TTL = 600  # seconds
+
+B64_CHUNK_SIZE = 64 * 1024  # Multiple of 4 so each slice decodes on its own
+
+UPSAMPLER_CACHE = {}
+ESRGAN_MODULES = {}
+STATE_DB_CACHE = {}
+
+HISTORY_COLUMNS = (
+    "prompt", "response_id", "size", "quality", "timestamp", "iterate_from", "file_path", "original_path"
+)
+INSERT_HISTORY_SQL = (
+    f"INSERT OR REPLACE INTO history (id, {', '.join(HISTORY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(HISTORY_COLUMNS) + 1))})"
+)
+PREPROCESS_KERNEL = {}
+OPENAI_CLIENT_CACHE = {}
 
 
 def get_help():
@@ -41,6 +93,9 @@ Options:
   --output-dir     Directory to save images (default: ~/Pictures/Wallpapers)
   --skip-upscale   Skip AI upscaling (save original 1792x1024)
   --upscale-size   Target resolution (default: 3840x2160)
+  --save-original  Also save the original 1792x1024 image when upscaling
+  --fp32           Upscale in full precision instead of FP16 on GPU
+  --tile           Upscale tile size in pixels, 0 disables tiling (default: 400)
   --list-ids       List previous generation IDs
   --help           Show this help message
 
@@ -62,22 +117,33 @@ Response Models:
 
 def load_api_key():
     """Load OpenAI API key from file"""
-    key_file = os.path.expanduser("~/.openai_api_key")
-    if not os.path.exists(key_file):
+    if not os.path.exists(API_KEY_FILE):
         print("❌ OpenAI API key not found!")
         print("Please save your API key to ~/.openai_api_key")
         print("You can get an API key from: https://platform.openai.com/api-keys")
         sys.exit(1)
     
     try:
-        with open(key_file, 'r') as f:
+        with open(API_KEY_FILE, 'r') as f:
             return f.read().strip()
     except Exception as e:
         print(f"❌ Error reading API key: {e}")
         sys.exit(1)
 
 
+def get_openai_client():
+    """Build the shared AsyncOpenAI client on first use"""
+    if "client" not in OPENAI_CLIENT_CACHE:
+        # Deferred so --help, --list-ids and --test-session don't pay for the openai import
+        from openai import AsyncOpenAI
+        # One shared client so all requests reuse its connection pool
+        OPENAI_CLIENT_CACHE["client"] = AsyncOpenAI(api_key=load_api_key())
+    return OPENAI_CLIENT_CACHE["client"]
+
+
+@lru_cache(maxsize=None)
 def ensure_config_dir():
+    # Only the first call per process touches the filesystem
     os.makedirs(CONFIG_DIR, exist_ok=True)
 
 
@@ -88,8 +154,8 @@ def load_location():
         print("Please create ~/.config/wallpapergenerator/location.json with e.g. {\"location\": \"Your City, Country\"}")
         sys.exit(1)
     try:
-        with open(LOCATION_FILE, "r") as f:
-            data = json.load(f)
+        with open(LOCATION_FILE, "rb") as f:
+            data = json_loads(f.read())
             location = data.get("location")
             if not location:
                 print("❌ Location not set in config file!")
@@ -125,30 +191,94 @@ def save_theme_to_history(theme):
         print(f"⚠️  Error saving theme to history: {e}")
 
 
-def load_generation_history():
-    """Load previous generation IDs and metadata"""
+def history_row(gen_id, entry):
+    """Flatten a history entry into the column order of INSERT_HISTORY_SQL"""
+    return (gen_id, *(entry.get(column) for column in HISTORY_COLUMNS))
+
+
+def migrate_legacy_state(conn):
+    """Import history.json/history.jsonl and daily_prompt.json, then rename them to .bak"""
+    for path in (HISTORY_FILE, HISTORY_JSONL):
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'rb') as f:
+                if path == HISTORY_FILE:
+                    entries = [{"id": gen_id, **data} for gen_id, data in json_loads(f.read()).items()]
+                else:
+                    entries = [json_loads(line) for line in f if line.strip()]
+            conn.execute("BEGIN")
+            conn.executemany(INSERT_HISTORY_SQL, [history_row(entry.pop("id"), entry) for entry in entries])
+            conn.execute("COMMIT")
+            os.rename(path, path + ".bak")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️  Error migrating {os.path.basename(path)}: {e}")
+    if os.path.exists(DAILY_PROMPT_FILE):
+        try:
+            with open(DAILY_PROMPT_FILE, 'rb') as f:
+                state = json_loads(f.read())
+            conn.execute("INSERT OR IGNORE INTO kv (name, value) VALUES ('daily_state', ?)", (json_dumps(state),))
+            os.rename(DAILY_PROMPT_FILE, DAILY_PROMPT_FILE + ".bak")
+        except Exception as e:
+            print(f"⚠️  Error migrating daily prompt: {e}")
+
+
+def get_state_db():
+    """Open the SQLite state database once per process, creating it on first use"""
+    if "conn" in STATE_DB_CACHE:
+        return STATE_DB_CACHE["conn"]
     ensure_config_dir()
-    if not os.path.exists(HISTORY_FILE):
-        return {}
+    conn = sqlite3.connect(STATE_DB_FILE, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS kv (name TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS history (
+            id TEXT PRIMARY KEY, prompt TEXT, response_id TEXT, size TEXT, quality TEXT,
+            timestamp TEXT, iterate_from TEXT, file_path TEXT, original_path TEXT
+        );
+        CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp DESC);
+    """)
+    migrate_legacy_state(conn)
+    STATE_DB_CACHE["conn"] = conn
+    return conn
+
+
+def row_to_entry(row):
+    return {column: row[column] for column in HISTORY_COLUMNS if row[column] is not None}
+
+
+def load_generation_history():
+    """Load all previous generation IDs and metadata, oldest first"""
     try:
-        with open(HISTORY_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
+        rows = get_state_db().execute("SELECT * FROM history ORDER BY timestamp").fetchall()
+    except sqlite3.Error as e:
         print(f"⚠️  Error loading generation history: {e}")
         return {}
+    return {row["id"]: row_to_entry(row) for row in rows}
 
 
-def save_generation_history(history):
-    """Save generation IDs and metadata"""
-    ensure_config_dir()
+def get_generation_entry(gen_id):
+    """Look up a single generation's metadata by ID"""
     try:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
-    except Exception as e:
+        row = get_state_db().execute("SELECT * FROM history WHERE id = ?", (gen_id,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️  Error loading generation history: {e}")
+        return None
+    return row_to_entry(row) if row else None
+
+
+def save_generation_history_entry(gen_id, entry):
+    """Insert one generation's metadata into the history table"""
+    try:
+        get_state_db().execute(INSERT_HISTORY_SQL, history_row(gen_id, entry))
+    except sqlite3.Error as e:
         print(f"⚠️  Error saving generation history: {e}")
 
 
-def generate_image(client, prompt, quality="hd", iterate_id=None):
+async def generate_image(client, prompt, quality="hd", iterate_id=None):
     """Generate image using OpenAI responses API with image_generation tool"""
     try:
         # Add explicit size and quality instructions to the prompt
@@ -157,29 +287,30 @@ def generate_image(client, prompt, quality="hd", iterate_id=None):
         print(f"🎨 Generating image: '{prompt}'")
         print(f"📐 Target: 1792x1024 (widescreen), Quality: {quality}")
 
-        history = load_generation_history()
         previous_response_id = None
-        if iterate_id and iterate_id in history:
-            previous_response_id = history[iterate_id].get("response_id")
+        previous_entry = get_generation_entry(iterate_id) if iterate_id else None
+        if previous_entry:
+            previous_response_id = previous_entry.get("response_id")
             print(f"🔄 Iterating on response ID: {previous_response_id}")
 
         # Use gpt-4.1 (full model, not mini) for better image quality
-        response = client.responses.create(
+        response = await client.responses.create(
             model="gpt-4.1",
             input=enhanced_prompt,
-            tools=[{"type": "image_generation"}],
+            # The tool only returns base64 (no URL to stream), so pin PNG to match the .png filenames
+            tools=[{"type": "image_generation", "output_format": "png"}],
             previous_response_id=previous_response_id if previous_response_id else None
         )
-        image_data = [
-            output.result
-            for output in response.output
-            if output.type == "image_generation_call"
-        ]
-        if not image_data:
+        image_base64 = next(
+            (output.result for output in response.output if output.type == "image_generation_call"),
+            None
+        )
+        if image_base64 is None:
             print("❌ No image data returned from OpenAI.")
             sys.exit(1)
-        image_base64 = image_data[0]
-        generation_id = f"gen_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(prompt) % 10000}"
+        # Stable across processes, unlike hash() with PYTHONHASHSEED randomisation
+        suffix = int.from_bytes(hashlib.blake2b(prompt.encode(), digest_size=2).digest(), "big")
+        generation_id = f"gen_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{suffix:04x}"
         return {
             "id": generation_id,
             "image_base64": image_base64,
@@ -196,11 +327,21 @@ def generate_image(client, prompt, quality="hd", iterate_id=None):
 
 
 def save_image_from_base64(b64_data, output_path):
-    """Save base64 image data to file"""
+    """Save base64 image data to file, decoding in chunks so the full PNG is never held twice"""
     try:
-        import base64
-        with open(output_path, 'wb') as f:
-            f.write(base64.b64decode(b64_data))
+        fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        # Reserve the decoded size up front so the kernel can allocate contiguous extents
+        decoded_size = len(b64_data) * 3 // 4 - b64_data[-2:].count("=")
+        if decoded_size > 0 and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, decoded_size)
+            except OSError:
+                pass  # Filesystem doesn't support it; the write still works
+        with os.fdopen(fd, 'wb', buffering=1 << 20) as f:
+            for start in range(0, len(b64_data), B64_CHUNK_SIZE):
+                f.write(base64.b64decode(b64_data[start:start + B64_CHUNK_SIZE]))
+            # The reservation is only an estimate; drop any preallocated tail past the real data
+            f.truncate(f.tell())
         print(f"💾 Image saved to: {output_path}")
         return True
     except Exception as e:
@@ -208,69 +349,288 @@ def save_image_from_base64(b64_data, output_path):
         return False
 
 
-def upscale_image_realesrgan(input_path, output_path, target_size=(3840, 2160)):
+def load_esrgan():
     """
-    Upscale image using Real-ESRGAN to target resolution
+    Import torch and Real-ESRGAN on first use and cache the modules
 
-    Args:
-        input_path: Path to input image
-        output_path: Path to save upscaled image
-        target_size: Target resolution tuple (width, height), default 3840x2160
+    Deferred so --help, --list-ids and --test-session don't pay for torch's startup.
+    Returns True if they're available; otherwise the ImportError is kept in
+    ESRGAN_MODULES["error"].
+    """
+    if "error" not in ESRGAN_MODULES:
+        try:
+            import torch
+            from basicsr.archs.rrdbnet_arch import RRDBNet
+            from basicsr.utils.download_util import load_file_from_url
+            from realesrgan import RealESRGANer
+            ESRGAN_MODULES.update(
+                torch=torch, RRDBNet=RRDBNet, load_file_from_url=load_file_from_url,
+                RealESRGANer=RealESRGANer, error=None
+            )
+        except ImportError as e:
+            ESRGAN_MODULES["error"] = e
+    return ESRGAN_MODULES["error"] is None
+
+
+def get_model_path():
+    """Download the x4plus checkpoint once and return its local path"""
+    # Keep the checkpoint at a known path so it's only fetched once
+    model_path = os.path.join(MODEL_CACHE_DIR, os.path.basename(REALESRGAN_MODEL_URL))
+    if not os.path.exists(model_path):
+        load_file_from_url = ESRGAN_MODULES["load_file_from_url"]
+        model_path = load_file_from_url(REALESRGAN_MODEL_URL, model_dir=MODEL_CACHE_DIR, progress=True)
+    return model_path
+
+
+def build_trt_engine(engine_path, height, width, half):
+    """Export RRDBNet to ONNX with dynamic spatial axes and compile it with trtexec for one input shape"""
+    print("   Building TensorRT engine (one-time, may take several minutes)...")
+    torch, RRDBNet = ESRGAN_MODULES["torch"], ESRGAN_MODULES["RRDBNet"]
+    model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=4)
+    checkpoint = torch.load(get_model_path(), map_location="cpu")
+    model.load_state_dict(checkpoint.get("params_ema", checkpoint.get("params", checkpoint)), strict=True)
+    model.eval()
+
+    onnx_path = engine_path.replace(".engine", ".onnx")
+    tmp_engine_path = engine_path + ".tmp"
+    try:
+        # Trace at a small size; tracing the full image would hold GBs of fp32 activations on the CPU
+        with torch.no_grad():
+            torch.onnx.export(
+                model, torch.zeros(1, 3, 64, 64), onnx_path,
+                input_names=["input"], output_names=["output"], opset_version=17,
+                dynamic_axes={"input": {2: "height", 3: "width"}, "output": {2: "height", 3: "width"}}
+            )
+
+        shape = f"input:1x3x{height}x{width}"
+        cmd = [
+            "trtexec", f"--onnx={onnx_path}", f"--saveEngine={tmp_engine_path}",
+            f"--minShapes={shape}", f"--optShapes={shape}", f"--maxShapes={shape}"
+        ]
+        if half:
+            cmd.append("--fp16")
+        subprocess.run(cmd, check=True, capture_output=True)
+        # Only a complete engine ever appears under the name later runs trust
+        os.replace(tmp_engine_path, engine_path)
+    finally:
+        for path in (onnx_path, tmp_engine_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def upscale_with_tensorrt(img, half):
+    """
+    Run the x4plus model through a cached TensorRT engine
 
-    Returns:
-        True if successful, False otherwise
+    Returns the upscaled BGR uint8 image, or None if TensorRT isn't usable
+    so the caller can fall back to RealESRGANer.
     """
     try:
-        print(f"🔍 Upscaling image with Real-ESRGAN...")
-        print(f"   Input: {input_path}")
-        print(f"   Target: {target_size[0]}x{target_size[1]}")
+        import tensorrt as trt
+    except ImportError:
+        return None
+    torch = ESRGAN_MODULES["torch"]
+    if not torch.cuda.is_available() or shutil.which("trtexec") is None:
+        return None
+
+    height, width = img.shape[:2]
+    precision = "fp16" if half else "fp32"
+    engine_path = os.path.join(MODEL_CACHE_DIR, f"realesrgan_x4plus_{width}x{height}_{precision}.engine")
+
+    # A failed build is remembered per TensorRT version so it isn't retried on every run
+    failed_marker = engine_path + ".failed"
+    if os.path.exists(failed_marker):
+        with open(failed_marker) as f:
+            if f.read().strip() == trt.__version__:
+                return None
+
+    try:
+        key = ("tensorrt", engine_path)
+        if key not in UPSAMPLER_CACHE:
+            os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+            if not os.path.exists(engine_path):
+                try:
+                    build_trt_engine(engine_path, height, width, half)
+                except Exception:
+                    with open(failed_marker, "w") as f:
+                        f.write(trt.__version__)
+                    raise
+            runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+            with open(engine_path, "rb") as f:
+                engine = runtime.deserialize_cuda_engine(f.read())
+            if engine is None:
+                # Built by another TensorRT version or otherwise unusable; rebuild next run
+                os.remove(engine_path)
+                return None
+            context = engine.create_execution_context()
+            # The spatial axes are dynamic in the network, so the context needs the concrete shape
+            if hasattr(context, "set_input_shape"):
+                context.set_input_shape("input", (1, 3, height, width))
+            else:
+                context.set_binding_shape(0, (1, 3, height, width))
+            UPSAMPLER_CACHE[key] = (engine, context)
+        engine, context = UPSAMPLER_CACHE[key]
+
+        # BGR uint8 HWC -> RGB float NCHW in [0, 1], on the GPU
+        inp = torch.from_numpy(img[:, :, ::-1].copy()).cuda()
+        inp = inp.permute(2, 0, 1).unsqueeze(0).float().div_(255.0).contiguous()
+        out = torch.empty((1, 3, height * 4, width * 4), dtype=torch.float32, device="cuda")
+
+        if not context.execute_v2([inp.data_ptr(), out.data_ptr()]):
+            return None
+        torch.cuda.synchronize()
+
+        out = out.squeeze(0).clamp_(0, 1).mul_(255.0).round_().byte()
+        return out.permute(1, 2, 0).cpu().numpy()[:, :, ::-1].copy()
+    except Exception as e:
+        print(f"   TensorRT unavailable ({e}), using PyTorch")
+        return None
 
-        # Import Real-ESRGAN components
-        from basicsr.archs.rrdbnet_arch import RRDBNet
-        from realesrgan import RealESRGANer
+
+def get_upsampler(scale, half, device, tile=400):
+    """Build a RealESRGANer once per (scale, half, device, tile) and reuse it"""
+    key = (scale, half, device, tile)
+    if key not in UPSAMPLER_CACHE:
+        if not load_esrgan():
+            raise ESRGAN_MODULES["error"]
+        RRDBNet, RealESRGANer = ESRGAN_MODULES["RRDBNet"], ESRGAN_MODULES["RealESRGANer"]
 
         # Use RealESRGAN_x4plus model (best quality for general images)
-        model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=4)
+        model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=scale)
 
-        # Initialize upscaler
-        upsampler = RealESRGANer(
-            scale=4,
-            model_path='https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.0/RealESRGAN_x4plus.pth',
+        UPSAMPLER_CACHE[key] = RealESRGANer(
+            scale=scale,
+            model_path=get_model_path(),
             model=model,
-            tile=0,  # No tiling for maximum quality (use GPU memory efficiently)
+            tile=tile,  # Bounded tiles keep peak VRAM low enough for FP16 on smaller GPUs
             tile_pad=10,
             pre_pad=0,
-            half=False  # Use full precision for best quality
+            half=half,
+            device=device
         )
+    return UPSAMPLER_CACHE[key]
 
-        # Read input image
-        img = cv2.imread(input_path, cv2.IMREAD_COLOR)
-        if img is None:
-            print(f"❌ Failed to read image: {input_path}")
-            return False
+
+def get_preprocess_kernel():
+    """Compile the fused BGR uint8 -> RGB CHW float32 kernel, or None without numba"""
+    if "preprocess" not in PREPROCESS_KERNEL:
+        try:
+            from numba import njit, prange
+        except ImportError:
+            PREPROCESS_KERNEL["preprocess"] = None
+            return None
+
+        @njit(parallel=True, fastmath=True, cache=True)
+        def bgr_u8_to_chw_f32(img, out):
+            h, w = img.shape[0], img.shape[1]
+            scale = np.float32(1.0 / 255.0)
+            for y in prange(h):
+                for x in range(w):
+                    out[0, y, x] = img[y, x, 2] * scale
+                    out[1, y, x] = img[y, x, 1] * scale
+                    out[2, y, x] = img[y, x, 0] * scale
+
+        PREPROCESS_KERNEL["preprocess"] = bgr_u8_to_chw_f32
+    return PREPROCESS_KERNEL["preprocess"]
+
+
+def enhance_fused(upsampler, img, outscale=None):
+    """
+    RealESRGANer.enhance for 8-bit BGR images with the colour conversion,
+    normalisation and HWC -> CHW transpose done in one pass
+
+    Falls back to upsampler.enhance for anything else or when numba is missing.
+    """
+    kernel = get_preprocess_kernel()
+    if kernel is None or img.dtype != np.uint8 or img.ndim != 3 or img.shape[2] != 3:
+        return upsampler.enhance(img, outscale=outscale)
+
+    h_input, w_input = img.shape[0:2]
+    chw = np.empty((3, h_input, w_input), np.float32)
+    kernel(img, chw)
+
+    torch = ESRGAN_MODULES["torch"]
+    # Same as the @torch.no_grad() on RealESRGANer.enhance; process() doesn't disable
+    # autograd itself, so without this a whole-image pass keeps every activation
+    with torch.no_grad():
+        # pre_process transposes HWC -> CHW; hand it a HWC view so that's a no-op
+        upsampler.pre_process(chw.transpose(1, 2, 0))
+        if upsampler.tile_size > 0:
+            upsampler.tile_process()
+        else:
+            upsampler.process()
+        output_img = upsampler.post_process()
+    output_img = output_img.data.squeeze().float().cpu().clamp_(0, 1).numpy()
+    output_img = np.transpose(output_img[[2, 1, 0], :, :], (1, 2, 0))
+    output = (output_img * 255.0).round().astype(np.uint8)
+
+    if outscale is not None and outscale != float(upsampler.scale):
+        output = cv2.resize(
+            output, (int(w_input * outscale), int(h_input * outscale)),
+            interpolation=cv2.INTER_LANCZOS4
+        )
+    return output, "RGB"
+
+
+def upscale_image_realesrgan(img, output_path, target_size=(3840, 2160), fp32=False, tile=400):
+    """
+    Upscale image using Real-ESRGAN to target resolution
+
+    Args:
+        img: Decoded BGR image array
+        output_path: Path to save upscaled image
+        target_size: Target resolution tuple (width, height), default 3840x2160
+        fp32: Force full precision even when a CUDA GPU is available
+        tile: Tile size in pixels for inference, 0 to process the whole image at once
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not load_esrgan():
+        print(f"⚠️  Real-ESRGAN not properly installed: {ESRGAN_MODULES['error']}")
+        print("   Skipping upscaling. Run: pipx install ./wallpapergenerator --force")
+        return False
+
+    try:
+        print(f"🔍 Upscaling image with Real-ESRGAN...")
+        print(f"   Input: {img.shape[1]}x{img.shape[0]}")
+        print(f"   Target: {target_size[0]}x{target_size[1]}")
+
+        # Half precision on GPU; CPU convolutions don't support FP16
+        torch = ESRGAN_MODULES["torch"]
+        half = torch.cuda.is_available() and not fp32
+        device = "cuda" if torch.cuda.is_available() else "cpu"
 
         # Upscale (this will take 10-15 seconds for quality)
         print("   Processing... (this may take 15-30 seconds)")
-        output, _ = upsampler.enhance(img, outscale=4)
+        target_w, target_h = target_size
+        img_h, img_w = img.shape[:2]
+
+        # When the aspect ratio matches, let Real-ESRGAN scale straight to the target
+        outscale = 4
+        if abs(target_w / img_w - target_h / img_h) < 1e-3:
+            outscale = target_w / img_w
+
+        output = upscale_with_tensorrt(img, half)
+        if output is None:
+            upsampler = get_upsampler(4, half, device, tile)
+            output, _ = enhance_fused(upsampler, img, outscale=outscale)
 
         # Resize to exact target dimensions if needed
         current_h, current_w = output.shape[:2]
-        target_w, target_h = target_size
 
         if (current_w, current_h) != (target_w, target_h):
             print(f"   Resizing from {current_w}x{current_h} to {target_w}x{target_h}")
-            output = cv2.resize(output, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
+            interpolation = cv2.INTER_AREA if current_w > target_w else cv2.INTER_LANCZOS4
+            resized = np.empty((target_h, target_w, output.shape[2]), np.uint8)
+            output = cv2.resize(output, (target_w, target_h), dst=resized, interpolation=interpolation)
 
-        # Save upscaled image
-        cv2.imwrite(output_path, output)
+        # Save upscaled image; low zlib effort, the size difference is small for photos
+        cv2.imwrite(output_path, output, [cv2.IMWRITE_PNG_COMPRESSION, 1])
         print(f"✨ Upscaled image saved to: {output_path}")
 
         return True
 
-    except ImportError as e:
-        print(f"⚠️  Real-ESRGAN not properly installed: {e}")
-        print("   Skipping upscaling. Run: pipx install ./wallpapergenerator --force")
-        return False
     except Exception as e:
         print(f"⚠️  Error during upscaling: {e}")
         print("   Original image saved without upscaling")
@@ -281,14 +641,30 @@ def set_wallpaper(image_path):
     """Set image as desktop wallpaper (Cinnamon only)"""
     try:
         # Cinnamon desktop uses gsettings for org.cinnamon.desktop.background
-        result = subprocess.run([
-            "gsettings", "set", "org.cinnamon.desktop.background", 
-            "picture-uri", f"file://{image_path}"
-        ], capture_output=True)
-        
-        if result.returncode == 0:
-            print("🖼️  Wallpaper set successfully (Cinnamon)")
-            return True
+        try:
+            # Write the key through GIO directly rather than spawning gsettings; needs the
+            # optional PyGObject ("gnome" extra), otherwise the gsettings path below runs
+            import gi
+            gi.require_version("Gio", "2.0")
+            from gi.repository import Gio
+
+            # Gio.Settings.new() aborts the process on an unknown schema, so look it up first
+            schema_source = Gio.SettingsSchemaSource.get_default()
+            if schema_source and schema_source.lookup("org.cinnamon.desktop.background", True):
+                settings = Gio.Settings.new("org.cinnamon.desktop.background")
+                settings.set_string("picture-uri", f"file://{image_path}")
+                Gio.Settings.sync()
+                print("🖼️  Wallpaper set successfully (Cinnamon)")
+                return True
+        except (ImportError, ValueError):
+            result = subprocess.run([
+                "gsettings", "set", "org.cinnamon.desktop.background", 
+                "picture-uri", f"file://{image_path}"
+            ], capture_output=True)
+
+            if result.returncode == 0:
+                print("🖼️  Wallpaper set successfully (Cinnamon)")
+                return True
         
         print("⚠️  Could not set wallpaper automatically for Cinnamon.")
         print("Please set it manually from the saved file.")
@@ -308,24 +684,22 @@ def validate_quality(quality):
     return quality
 
 
-def create_filename(prompt, size, quality, generation_id, upscaled=False):
-    """Create a safe filename from prompt and parameters"""
+def build_filenames(prompt, quality, generation_id):
+    """Create safe filenames for the original and upscaled image, keyed by size"""
     # Clean prompt for filename
-    safe_prompt = "".join(c for c in prompt if c.isalnum() or c in (' ', '-', '_')).rstrip()
-    safe_prompt = safe_prompt.replace(' ', '_')[:30]  # Limit length
+    safe_prompt = UNSAFE_FILENAME_CHARS.sub("", prompt).rstrip().replace(' ', '_')[:30]  # Limit length
     # Extract date/time from generation_id
     # generation_id: gen_YYYYMMDD_HHMMSS_xxxx
     try:
-        dt_part = generation_id.split('_')[1] + '_' + generation_id.split('_')[2]
-        dt_fmt = datetime.strptime(dt_part, "%Y%m%d_%H%M%S")
-        date_str = dt_fmt.strftime("%Y-%m-%d_%H-%M-%S")
-    except Exception:
+        _, day, time_of_day, _ = generation_id.split('_', 3)
+        date_str = datetime.strptime(f"{day}_{time_of_day}", "%Y%m%d_%H%M%S").strftime("%Y-%m-%d_%H-%M-%S")
+    except ValueError:
         date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
-    if upscaled:
-        return f"{date_str}_wallpaper_{safe_prompt}_3840x2160.png"
-    else:
-        return f"{date_str}_wallpaper_{safe_prompt}_1792x1024.png"
+    return {
+        size: f"{date_str}_wallpaper_{safe_prompt}_{size}.png"
+        for size in ("1792x1024", "3840x2160")
+    }
 
 
 def list_generation_ids():
@@ -338,7 +712,7 @@ def list_generation_ids():
     print("📜 Previous Generations:")
     print("-" * 80)
     
-    for gen_id, data in sorted(history.items(), key=lambda x: x[1].get('timestamp', '')):
+    for gen_id, data in history.items():
         timestamp = data.get('timestamp', 'Unknown')
         prompt = data.get('prompt', 'No prompt')[:50]
         size = data.get('size', 'Unknown')
@@ -358,90 +732,95 @@ def list_generation_ids():
 def get_today_str():
     return date.today().isoformat()
 
-# Load daily prompt from file
-def load_daily_prompt():
-    ensure_config_dir()
-    if not os.path.exists(DAILY_PROMPT_FILE):
-        return None, None
+# Load the daily state (theme, prompt and cached weather)
+def load_daily_state():
     try:
-        with open(DAILY_PROMPT_FILE, "r") as f:
-            data = json.load(f)
-            if data.get("date") == get_today_str():
-                return data.get("theme"), data.get("prompt")
+        row = get_state_db().execute("SELECT value FROM kv WHERE name = 'daily_state'").fetchone()
+        return json_loads(row["value"]) if row else {}
     except Exception:
-        pass
+        return {}
+
+# Merge fields into the daily state
+def update_daily_state(**fields):
+    state = load_daily_state()
+    state.update(fields)
+    try:
+        get_state_db().execute(
+            "INSERT OR REPLACE INTO kv (name, value) VALUES ('daily_state', ?)", (json_dumps(state),)
+        )
+    except sqlite3.Error as e:
+        print(f"⚠️  Error saving daily state: {e}")
+
+# Load daily prompt from the state database
+def load_daily_prompt():
+    data = load_daily_state()
+    if data.get("date") == get_today_str():
+        return data.get("theme"), data.get("prompt")
     return None, None
 
-# Save daily prompt to file
+# Save daily prompt to the state database
 def save_daily_prompt(theme, prompt):
-    ensure_config_dir()
-    with open(DAILY_PROMPT_FILE, "w") as f:
-        json.dump({"date": get_today_str(), "theme": theme, "prompt": prompt}, f)
+    update_daily_state(date=get_today_str(), theme=theme, prompt=prompt)
 
-# Generate a new theme (Stage 1 of 3)
-def generate_new_theme(client):
-    """Generate a unique theme that doesn't overlap with past themes"""
+# Generate a new theme and base prompt for the day in one call (Stage 1 of 2)
+async def generate_theme_and_prompt(client):
+    """Generate a unique theme and a detailed wallpaper prompt for it"""
     past_themes = load_theme_history()
 
+    request = (
+        "Generate a single, concise theme (2-5 words) for a wallpaper image. "
+        "Be creative and eclectic. Explore different art styles, subjects, moods, and concepts. "
+    )
     if past_themes:
         past_themes_text = "\n".join([f"- {theme}" for theme in past_themes[-30:]])  # Last 30 themes for context
-        theme_prompt = (
-            f"Generate a single, concise theme (2-5 words) for a wallpaper image. "
-            f"Be creative and eclectic. Here are recent past themes to AVOID overlapping with:\n\n"
+        request += (
+            f"Here are recent past themes to AVOID overlapping with:\n\n"
             f"{past_themes_text}\n\n"
-            f"Generate a NEW theme that is distinctly different from these past themes. "
-            f"Explore different art styles, subjects, moods, and concepts. "
-            f"Respond with ONLY the theme, nothing else."
-        )
-    else:
-        theme_prompt = (
-            "Generate a single, concise theme (2-5 words) for a wallpaper image. "
-            "Be creative and eclectic. Explore different art styles, subjects, moods, and concepts. "
-            "Respond with ONLY the theme, nothing else."
+            f"The theme must be distinctly different from these past themes. "
         )
+    request += (
+        "Then write a creative, visually interesting wallpaper prompt for an AI image generator "
+        "based on that theme: a detailed description that will result in a stunning wallpaper. "
+        "Do not include any time, weather, or season information - that will be added later. "
+        'Respond with a JSON object of the form {"theme": "...", "prompt": "..."}.'
+    )
 
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="gpt-4o",
-        messages=[{"role": "user", "content": theme_prompt}]
+        messages=[{"role": "user", "content": request}],
+        response_format={"type": "json_object"}
     )
-    theme = response.choices[0].message.content.strip()
+    data = json_loads(response.choices[0].message.content)
     # Clean up any quotes or extra formatting
-    theme = theme.strip('"\'')
-    return theme
-
-
-# Generate a new base prompt for the day using the theme (Stage 2 of 3)
-def get_new_base_prompt(client, theme):
-    """Generate a detailed wallpaper prompt based on the given theme"""
-    prompt_generation = (
-        f"Generate a creative, visually interesting wallpaper prompt for an AI image generator "
-        f"based on this theme: '{theme}'. "
-        f"Create a detailed description that will result in a stunning wallpaper. "
-        f"Do not include any time, weather, or season information - that will be added later. "
-        f"Respond with ONLY the prompt description, nothing else."
-    )
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt_generation}]
-    )
-    return response.choices[0].message.content.strip()
+    theme = data["theme"].strip().strip('"\'')
+    return theme, data["prompt"].strip()
 
-# Build the full prompt for image generation
-def build_full_prompt(base_prompt, client):
-    location = load_location()
-    tz = pytz.timezone("America/New_York")
-    now = datetime.now(tz)
+
+# Ask GPT for the current season/weather/time context at the user's location
+async def get_location_context(client, location):
+    # Weather moves on a scale of minutes, so reuse a recent answer instead of asking again
+    state = load_daily_state()
+    if (state.get("weather_location") == location
+            and time.time() - state.get("weather_ts", 0) < WEATHER_CACHE_TTL):
+        return state["weather"]
+
+    now = datetime.now(LOCAL_TZ)
     time_str = now.strftime("%I:%M %p").lstrip("0")
     date_str = now.strftime("%B %d, %Y")
     # Ask GPT for a phrase describing the current season, climate, weather, and time in the user's location
     weather_season_prompt = (
         f"Describe the current season, climate, weather, and time in {location} at {time_str} on {date_str}. Respond with a short phrase suitable for an image prompt."
     )
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="gpt-4o",
         messages=[{"role": "user", "content": weather_season_prompt}]
     )
-    location_context = response.choices[0].message.content.strip()
+    weather = response.choices[0].message.content.strip()
+    update_daily_state(weather=weather, weather_location=location, weather_ts=time.time())
+    return weather
+
+# Build the full prompt for image generation
+def build_full_prompt(base_prompt, location_context):
     # Compose final prompt
     return (
         f"{base_prompt} The image can take place anywhere, but it should reflect the current season, climate, weather, and time in your location. Context: {location_context}."
@@ -449,148 +828,172 @@ def build_full_prompt(base_prompt, client):
 
 # Find previous image ID for today (threading)
 def get_previous_image_id_today():
-    history = load_generation_history()
-    today = get_today_str()
-    # Find latest image for today
-    images_today = [
-        (gen_id, data) for gen_id, data in history.items()
-        if data.get("timestamp", "").startswith(today)
-    ]
-    if not images_today:
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    try:
+        # ISO timestamps sort lexically, so this is a range scan on the timestamp index
+        row = get_state_db().execute(
+            "SELECT id FROM history WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC LIMIT 1",
+            (today.isoformat(), tomorrow.isoformat())
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️  Error loading generation history: {e}")
+        return None
+    return row["id"] if row else None
+
+
+def get_session_hints_dbus(user):
+    """
+    Read LockedHint/IdleHint for the user's session straight from logind over D-Bus
+
+    Returns (locked, idle), None if no session exists, or raises ImportError
+    when PyGObject isn't available.
+    """
+    from gi.repository import Gio, GLib
+
+    bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+    sessions = bus.call_sync(
+        "org.freedesktop.login1", "/org/freedesktop/login1",
+        "org.freedesktop.login1.Manager", "ListSessions",
+        None, GLib.VariantType("(a(susso))"), Gio.DBusCallFlags.NONE, -1, None
+    ).unpack()[0]
+    # Accept any session ID for the current user
+    session_path = next((path for _, _, name, _, path in sessions if name == user), None)
+    if not session_path:
+        return None
+
+    props = bus.call_sync(
+        "org.freedesktop.login1", session_path,
+        "org.freedesktop.DBus.Properties", "GetAll",
+        GLib.Variant("(s)", ("org.freedesktop.login1.Session",)),
+        GLib.VariantType("(a{sv})"), Gio.DBusCallFlags.NONE, -1, None
+    ).unpack()[0]
+    return props["LockedHint"], props["IdleHint"]
+
+
+def get_session_hints_loginctl(user):
+    """Same as get_session_hints_dbus, by parsing loginctl output"""
+    session = None
+    # Find session for current user (accept any session ID)
+    result = subprocess.run(["loginctl", "list-sessions"], capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and parts[2] == user:
+            session = parts[0]
+            break
+    if not session:
         return None
-    # Return most recent
-    return sorted(images_today, key=lambda x: x[1]["timestamp"], reverse=True)[0][0]
+    status_result = subprocess.run(["loginctl", "show-session", session, "-p", "LockedHint", "-p", "IdleHint"], capture_output=True, text=True)
+    status = status_result.stdout
+    return "LockedHint=no" not in status, "IdleHint=no" not in status
 
 
 def is_session_unlocked_and_active():
     try:
         import getpass
         user = getpass.getuser()
-        session = None
-        # Find session for current user (accept any session ID)
-        result = subprocess.run(["loginctl", "list-sessions"], capture_output=True, text=True)
-        for line in result.stdout.splitlines():
-            parts = line.split()
-            if len(parts) >= 3 and parts[2] == user:
-                session = parts[0]
-                break
-        if not session:
+        try:
+            hints = get_session_hints_dbus(user)
+        except ImportError:
+            hints = get_session_hints_loginctl(user)
+        if hints is None:
             print(f"⚠️  No active session found for user '{user}'.")
             return False
-        status_result = subprocess.run(["loginctl", "show-session", session, "-p", "LockedHint", "-p", "IdleHint"], capture_output=True, text=True)
-        status = status_result.stdout
-        return ("LockedHint=no" in status) and ("IdleHint=no" in status)
+        locked, idle = hints
+        return not locked and not idle
     except Exception as e:
         print(f"⚠️  Session check error: {e}")
         return False
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate AI wallpapers using OpenAI GPT-image-1", add_help=False)
-    parser.add_argument("prompt", nargs="?", help="Description of the wallpaper to generate")
-    parser.add_argument("--help", action="store_true", help="Show help message")
-    parser.add_argument("--iterate", help="Iterate on a previous image using its ID")
-    parser.add_argument("--quality", default="hd", help="Image quality (standard, hd, high, medium, low)")
-    parser.add_argument("--save-only", action="store_true", help="Save image without setting as wallpaper")
-    parser.add_argument("--output-dir", default="~/Pictures/Wallpapers", help="Directory to save images")
-    parser.add_argument("--list-ids", action="store_true", help="List previous generation IDs")
-    parser.add_argument("--test-session", action="store_true", help="Test session lock/idle status and exit")
-    parser.add_argument("--reset-base-prompt", action="store_true", help="Reset the base prompt for today and start from scratch")
-    parser.add_argument("--skip-upscale", action="store_true", help="Skip AI upscaling (save original 1792x1024)")
-    parser.add_argument("--upscale-size", default="3840x2160", help="Target upscale resolution (default: 3840x2160)")
-    args = parser.parse_args()
-
-    if args.test_session:
-        if is_session_unlocked_and_active():
-            print("Session is unlocked and active.")
+async def get_daily_theme_and_prompt(client, reset=False):
+    """Return today's (theme, base_prompt), generating them if missing or reset"""
+    theme, base_prompt = (None, None) if reset else load_daily_prompt()
+    # If we don't have both theme and prompt (e.g., old format or new day), generate both
+    if not base_prompt or not theme:
+        if reset:
+            print("🔄 Resetting theme and base prompt for today...")
         else:
-            print("Session is locked or idle.")
-        return
-    if args.help:
-        get_help()
-    if args.list_ids:
-        list_generation_ids()
-        return
-    api_key = load_api_key()
-    client = OpenAI(api_key=api_key)
-
-    # Three-stage process: Theme -> Prompt -> Image
-    if args.reset_base_prompt:
-        print("🔄 Resetting theme and base prompt for today...")
-        # Stage 1: Generate new theme
-        print("🎭 Stage 1/3: Generating new theme...")
-        theme = generate_new_theme(client)
+            print("🌅 Generating new theme and base prompt for today...")
+        print("🎭 Stage 1/2: Generating theme and prompt...")
+        theme, base_prompt = await generate_theme_and_prompt(client)
         print(f"   Theme: {theme}")
+        print(f"   Prompt: {base_prompt}")
         save_theme_to_history(theme)
-
-        # Stage 2: Generate prompt based on theme
-        print("📝 Stage 2/3: Generating prompt from theme...")
-        base_prompt = get_new_base_prompt(client, theme)
         save_daily_prompt(theme, base_prompt)
-        print(f"   Prompt: {base_prompt}")
     else:
-        theme, base_prompt = load_daily_prompt()
-        # If we don't have both theme and prompt (e.g., old format or new day), generate both
-        if not base_prompt or not theme:
-            print("🌅 Generating new theme and base prompt for today...")
-            # Stage 1: Generate new theme
-            print("🎭 Stage 1/3: Generating new theme...")
-            theme = generate_new_theme(client)
-            print(f"   Theme: {theme}")
-            save_theme_to_history(theme)
-
-            # Stage 2: Generate prompt based on theme
-            print("📝 Stage 2/3: Generating prompt from theme...")
-            base_prompt = get_new_base_prompt(client, theme)
-            save_daily_prompt(theme, base_prompt)
-            print(f"   Prompt: {base_prompt}")
-        else:
-            print(f"🎭 Using today's theme: {theme}")
-            print(f"📝 Using today's base prompt: {base_prompt}")
-    # Build full prompt for this run (Stage 3 prepares the final image generation prompt)
-    print("🖼️  Stage 3/3: Generating image with location/time context...")
-    full_prompt = build_full_prompt(base_prompt, client)
-    print(f"   Final prompt: {full_prompt}")
-    # Find previous image for today (thread)
-    iterate_id = get_previous_image_id_today()
+        print(f"🎭 Using today's theme: {theme}")
+        print(f"📝 Using today's base prompt: {base_prompt}")
+    return theme, base_prompt
+
+
+async def generate_wallpaper(args):
+    # Local validation first so a bad invocation fails before any API setup
     quality = validate_quality(args.quality)
     output_dir = os.path.expanduser(args.output_dir)
     os.makedirs(output_dir, exist_ok=True)
-    # Generate image
-    result = generate_image(client, full_prompt, quality, iterate_id)
-    filename = create_filename(full_prompt, "1792x1024", quality, result["id"], upscaled=False)
-    output_path = os.path.join(output_dir, filename)
 
-    if save_image_from_base64(result["image_base64"], output_path):
-        print(f"✅ Image generated successfully!")
-        print(f"🆔 Generation ID: {result['id']}")
+    client = get_openai_client()
 
-        final_path = output_path
-        final_size = "1792x1024"
+    # Two-stage process: Theme + Prompt -> Image
+    # The location context doesn't depend on the theme/prompt, so fetch both concurrently
+    location = load_location()
+    (theme, base_prompt), location_context = await asyncio.gather(
+        get_daily_theme_and_prompt(client, args.reset_base_prompt),
+        get_location_context(client, location)
+    )
 
-        # Upscale if not skipped
-        if not args.skip_upscale:
-            # Parse upscale size
-            try:
-                upscale_w, upscale_h = map(int, args.upscale_size.split('x'))
-                upscale_filename = create_filename(full_prompt, "3840x2160", quality, result["id"], upscaled=True)
-                upscale_path = os.path.join(output_dir, upscale_filename)
-
-                if upscale_image_realesrgan(output_path, upscale_path, target_size=(upscale_w, upscale_h)):
-                    final_path = upscale_path
-                    final_size = f"{upscale_w}x{upscale_h}"
-                    print(f"🎯 Final resolution: {final_size}")
-                else:
-                    print(f"⚠️  Using original resolution: {final_size}")
-            except ValueError:
-                print(f"⚠️  Invalid upscale size format: {args.upscale_size}. Use WIDTHxHEIGHT (e.g., 3840x2160)")
-                print(f"   Using original resolution: {final_size}")
-        else:
-            print(f"⏭️  Skipping upscale (original resolution: {final_size})")
+    # Build full prompt for this run (Stage 2 prepares the final image generation prompt)
+    print("🖼️  Stage 2/2: Generating image with location/time context...")
+    full_prompt = build_full_prompt(base_prompt, location_context)
+    print(f"   Final prompt: {full_prompt}")
+    # Find previous image for today (thread)
+    iterate_id = get_previous_image_id_today()
+    # Generate image
+    result = await generate_image(client, full_prompt, quality, iterate_id)
+    filenames = build_filenames(full_prompt, quality, result["id"])
+    output_path = os.path.join(output_dir, filenames["1792x1024"])
+
+    print(f"✅ Image generated successfully!")
+    print(f"🆔 Generation ID: {result['id']}")
+
+    final_path = None
+    final_size = "1792x1024"
+
+    # Upscale if not skipped, straight from memory
+    if not args.skip_upscale:
+        # Parse upscale size
+        try:
+            upscale_w, upscale_h = map(int, args.upscale_size.split('x'))
+            upscale_path = os.path.join(output_dir, filenames["3840x2160"])
+
+            # The encoded bytes are only needed until cv2 has decoded them
+            img = cv2.imdecode(np.frombuffer(base64.b64decode(result["image_base64"]), np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                print("⚠️  Failed to decode generated image for upscaling")
+            elif upscale_image_realesrgan(img, upscale_path, target_size=(upscale_w, upscale_h), fp32=args.fp32, tile=args.tile):
+                final_path = upscale_path
+                final_size = f"{upscale_w}x{upscale_h}"
+                print(f"🎯 Final resolution: {final_size}")
+            else:
+                print(f"⚠️  Using original resolution: {final_size}")
+        except ValueError:
+            print(f"⚠️  Invalid upscale size format: {args.upscale_size}. Use WIDTHxHEIGHT (e.g., 3840x2160)")
+            print(f"   Using original resolution: {final_size}")
+    else:
+        print(f"⏭️  Skipping upscale (original resolution: {final_size})")
+
+    # The original only hits disk when it is the final image or was asked for
+    original_path = None
+    if final_path is None or args.save_original:
+        if save_image_from_base64(result["image_base64"], output_path):
+            original_path = output_path
+        if final_path is None:
+            final_path = original_path
 
+    if final_path:
         # Save history
-        history = load_generation_history()
-        history[result["id"]] = {
+        save_generation_history_entry(result["id"], {
             "prompt": result["prompt"],
             "response_id": result["response_id"],
             "size": final_size,
@@ -598,9 +1001,8 @@ def main():
             "timestamp": result["timestamp"],
             "iterate_from": result["iterate_from"],
             "file_path": final_path,
-            "original_path": output_path if final_path != output_path else None
-        }
-        save_generation_history(history)
+            "original_path": original_path if final_path != original_path else None
+        })
 
         # Set wallpaper using final (upscaled or original) image
         if not args.save_only:
@@ -612,5 +1014,37 @@ def main():
     print("🎉 Done!")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate AI wallpapers using OpenAI GPT-image-1", add_help=False)
+    parser.add_argument("prompt", nargs="?", help="Description of the wallpaper to generate")
+    parser.add_argument("--help", action="store_true", help="Show help message")
+    parser.add_argument("--iterate", help="Iterate on a previous image using its ID")
+    parser.add_argument("--quality", default="hd", help="Image quality (standard, hd, high, medium, low)")
+    parser.add_argument("--save-only", action="store_true", help="Save image without setting as wallpaper")
+    parser.add_argument("--output-dir", default="~/Pictures/Wallpapers", help="Directory to save images")
+    parser.add_argument("--list-ids", action="store_true", help="List previous generation IDs")
+    parser.add_argument("--test-session", action="store_true", help="Test session lock/idle status and exit")
+    parser.add_argument("--reset-base-prompt", action="store_true", help="Reset the base prompt for today and start from scratch")
+    parser.add_argument("--skip-upscale", action="store_true", help="Skip AI upscaling (save original 1792x1024)")
+    parser.add_argument("--upscale-size", default="3840x2160", help="Target upscale resolution (default: 3840x2160)")
+    parser.add_argument("--save-original", action="store_true", help="Also save the original 1792x1024 image when upscaling")
+    parser.add_argument("--fp32", action="store_true", help="Upscale in full precision instead of FP16 on GPU")
+    parser.add_argument("--tile", type=int, default=400, help="Upscale tile size in pixels, 0 disables tiling (default: 400)")
+    args = parser.parse_args()
+
+    if args.test_session:
+        if is_session_unlocked_and_active():
+            print("Session is unlocked and active.")
+        else:
+            print("Session is locked or idle.")
+        return
+    if args.help:
+        get_help()
+    if args.list_ids:
+        list_generation_ids()
+        return
+    asyncio.run(generate_wallpaper(args))
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
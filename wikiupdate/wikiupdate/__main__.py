@@ -7,19 +7,30 @@ Supports parallel import for faster processing and preserves revision history.
 """
 
 import argparse
+import hashlib
+import heapq
+import http.client
 import json
+import mmap
+import os
 import re
+import shutil
+import signal
+import socket
 import subprocess
 import sys
+import threading
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import requests
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn
-from rich.prompt import Confirm
-from rich.table import Table
+from rich.progress import Progress, SpinnerColumn, BarColumn, DownloadColumn, TextColumn, TimeRemainingColumn
 
 console = Console()
 
@@ -28,6 +39,214 @@ WIKI_DIR = Path("/mnt/das-storage/docker/mediawiki")
 DUMP_BASE_URL = "https://dumps.wikimedia.org/enwiki"
 WIKI_LANG = "enwiki"
 DUMP_TYPE = "pages-articles-multistream"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+ARIA2_CONNECTIONS = 8
+DOCKER_SOCKET = "/var/run/docker.sock"
+MARIADB_PORT = 3306
+# Dump artifacts removed by cleanup_old_dumps (for every date but the one kept)
+CLEANUP_SUFFIXES = (
+    ".xml", ".xml.partial", ".xml.bz2", ".xml.bz2.partial", ".xml.bz2.partial.aria2",
+    "-index.txt", "-index.txt.bz2", "-md5sums.txt",
+)
+REBUILD_OUTPUT_TAIL = 50  # Lines of a failed rebuild step shown on the console
+IMPORT_DB_COMMAND = [
+    "--innodb-buffer-pool-size=16G",
+    "--max-connections=200",
+    "--innodb-io-capacity=4000",
+    "--innodb-io-capacity-max=8000",
+]
+NORMAL_DB_COMMAND = [
+    "--innodb-buffer-pool-size=2G",
+    "--max-connections=50",
+    "--innodb-io-capacity=1000",
+    "--innodb-io-capacity-max=2000",
+]
+STEP_MARKER = "::STEP::"
+STATUS_MARKER = "::STATUS::"
+PROGRESS_RE = re.compile(rb'^(\d+)\s+\(([\d.]+)\s+pages/sec')
+HASH_CHUNK_SIZE = 4 * 1024 * 1024  # 4 MiB
+DUMP_CACHE_FILE = Path.home() / ".cache" / "wikiupdate" / "latest.json"
+DIRSIZE_CACHE_FILE = Path.home() / ".cache" / "wikiupdate" / "dirsize.json"
+LATEST_CHECK_TTL = 3600  # Seconds before the dump listing is checked again
+XML_EXPANSION_RATIO = 5  # Decompressed/compressed size of a pages-articles dump, rounded up
+XML_COPY_HEADROOM = 50 * 1024**3  # Free space left for MariaDB after keeping the decompressed copy
+DUMP_PROBE_LIMIT = 16  # Newest dump dates checked for completeness
+
+
+def file_md5(path: Path) -> str:
+    """MD5 a file through a read-only mmap without copying it into Python buffers."""
+    h = hashlib.md5(usedforsecurity=False)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ) as mm:
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                for offset in range(0, len(view), HASH_CHUNK_SIZE):
+                    h.update(view[offset:offset + HASH_CHUNK_SIZE])
+            finally:
+                view.release()
+    return h.hexdigest()
+
+
+def fadvise(fd: int, advice: str):
+    """Best-effort posix_fadvise over the whole file; a no-op where it's unsupported."""
+    if hasattr(os, "posix_fadvise") and hasattr(os, advice):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def backup_file(src: Path, backup: Path):
+    """Snapshot src as a hardlink (no data copied), falling back to a real copy.
+
+    Safe because the config files are only ever rewritten via os.replace, which
+    gives src a new inode and leaves the linked backup untouched.
+    """
+    backup.unlink(missing_ok=True)
+    try:
+        os.link(src, backup)
+    except OSError:
+        shutil.copy2(src, backup)
+
+
+def restore_file(backup: Path, dst: Path):
+    """Move a backup back over dst atomically."""
+    os.replace(backup, dst)
+    # rename() is a no-op when both names are links to the same inode
+    backup.unlink(missing_ok=True)
+
+
+def write_text_atomic(path: Path, text: str):
+    """Write text beside path and rename it into place."""
+    tmp_file = path.with_name(path.name + ".tmp")
+    tmp_file.write_text(text)
+    os.replace(tmp_file, path)
+
+
+def format_size(num_bytes: float) -> str:
+    """Format a byte count like `df -h`/`du -h` (1024-based)."""
+    for unit in ("B", "K", "M", "G", "T"):
+        if num_bytes < 1024 or unit == "T":
+            return f"{num_bytes:.0f}{unit}" if unit == "B" else f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+
+
+def dir_usage(path: str, cache: dict, visited: dict) -> int:
+    """Disk usage of a tree in bytes, reusing cached directory listings.
+
+    cache maps a directory to [st_mtime_ns, file names, subdirectories]. A
+    directory whose mtime is unchanged has the same entries, so its listing is
+    reused; file sizes are always re-read, since files (the MariaDB data files
+    especially) grow in place without touching their directory. Every directory
+    reached is recorded in visited, which becomes the next cache.
+    """
+    st = os.stat(path, follow_symlinks=False)
+    mtime_ns = st.st_mtime_ns
+    cached = cache.get(path)
+    if cached and cached[0] == mtime_ns:
+        files, subdirs = cached[1], cached[2]
+    else:
+        files, subdirs = [], []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    continue
+
+    visited[path] = [mtime_ns, files, subdirs]
+    # Allocated blocks, like du, so sparse/preallocated files count correctly
+    total = st.st_blocks * 512
+    for name in files:
+        try:
+            total += os.stat(os.path.join(path, name), follow_symlinks=False).st_blocks * 512
+        except OSError:
+            continue
+    for subdir in subdirs:
+        try:
+            total += dir_usage(subdir, cache, visited)
+        except OSError:
+            continue
+    return total
+
+
+def set_db_command(compose_file: Path, command: list[str]):
+    """Replace the db service's command in docker-compose.yml, keeping comments and layout."""
+    from ruamel.yaml import YAML
+    from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    yaml.indent(mapping=2, sequence=4, offset=2)
+    data = yaml.load(compose_file)
+
+    quoted = [DoubleQuotedScalarString(arg) for arg in command]
+    db = data["services"]["db"]
+    if isinstance(db.get("command"), list):
+        # Mutate the existing sequence so its flow style is kept
+        db["command"].clear()
+        db["command"].extend(quoted)
+    else:
+        db["command"] = quoted
+
+    tmp_file = compose_file.with_name(compose_file.name + ".tmp")
+    with open(tmp_file, 'w') as f:
+        yaml.dump(data, f)
+    os.replace(tmp_file, compose_file)
+
+
+def get_db_host_port(compose_file: Path) -> Optional[tuple[str, int]]:
+    """Find the host address docker-compose.yml publishes for the db service's MariaDB port."""
+    from ruamel.yaml import YAML
+
+    try:
+        ports = YAML().load(compose_file)["services"]["db"].get("ports") or []
+    except Exception:
+        return None
+
+    for port in ports:
+        if isinstance(port, dict):
+            # Long syntax: {target: 3306, published: 3306, host_ip: 127.0.0.1}
+            if int(port.get("target", 0)) == MARIADB_PORT and port.get("published"):
+                return probe_host(port.get("host_ip")), int(port["published"])
+            continue
+        # Short syntax: "3306", "3307:3306", "127.0.0.1:3307:3306" or "[::1]:3307:3306"
+        parts = str(port).split("/")[0].rsplit(":", 2)
+        try:
+            if int(parts[-1]) == MARIADB_PORT:
+                host = parts[0] if len(parts) == 3 else None
+                return probe_host(host), int(parts[-2]) if len(parts) > 1 else MARIADB_PORT
+        except ValueError:
+            continue  # Port ranges and variables aren't probed
+    return None
+
+
+def probe_host(host_ip: Optional[str]) -> str:
+    """Address to connect to for a published port bound to host_ip."""
+    host_ip = (host_ip or "").strip("[]")
+    # Unset or wildcard bindings are reachable over loopback
+    if host_ip in ("", "0.0.0.0", "::"):
+        return "127.0.0.1"
+    return host_ip
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that talks to a Unix domain socket instead of TCP."""
+
+    def __init__(self, socket_path: str):
+        super().__init__("localhost", timeout=5)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
 
 
 class WikiUpdater:
@@ -42,6 +261,13 @@ class WikiUpdater:
         self.wiki_lang = WIKI_LANG
         self.dump_type = DUMP_TYPE
         self.progress_file = wiki_dir / ".wikiupdate_progress.json"
+        # Shared so every request to dumps.wikimedia.org reuses one keep-alive pool
+        self.session = requests.Session()
+        self.page_counts: dict[str, int] = {}
+        self.last_progress_bytes: Optional[bytes] = None
+        self.docker_running: Optional[bool] = None
+        self.sudo_ok: Optional[bool] = None
+        self.dumpstatus_cache: dict[str, Optional[dict]] = {}
 
     def load_progress(self) -> dict:
         """Load progress state from file."""
@@ -55,9 +281,18 @@ class WikiUpdater:
 
     def save_progress(self, state: dict):
         """Save progress state to file."""
+        # Carry the cached index page count along with every status update
+        if self.page_counts and "page_counts" not in state:
+            state = {**state, "page_counts": self.page_counts}
         try:
-            with open(self.progress_file, 'w') as f:
-                json.dump(state, f, indent=2)
+            data = json.dumps(state, separators=(',', ':'), default=str).encode()
+            if data == self.last_progress_bytes:
+                return
+            # Write beside the target and rename over it so readers never see a torn file
+            tmp_file = self.progress_file.with_suffix('.json.tmp')
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, self.progress_file)
+            self.last_progress_bytes = data
         except Exception as e:
             console.print(f"[yellow]⚠ Could not save progress: {e}[/yellow]")
 
@@ -65,55 +300,124 @@ class WikiUpdater:
         """Clear progress state file."""
         if self.progress_file.exists():
             self.progress_file.unlink()
+        self.last_progress_bytes = None
+
+    def load_dump_cache(self) -> dict:
+        """Load the cached latest/current dump dates."""
+        try:
+            return json.loads(DUMP_CACHE_FILE.read_bytes())
+        except (OSError, ValueError):
+            return {}
+
+    def save_dump_cache(self, cache: dict):
+        """Save the cached latest/current dump dates."""
+        try:
+            DUMP_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            write_text_atomic(DUMP_CACHE_FILE, json.dumps(cache, separators=(',', ':')))
+        except OSError as e:
+            console.print(f"[yellow]⚠ Could not save dump cache: {e}[/yellow]")
+
+    def find_latest_complete(self, dates: list[str]) -> Optional[str]:
+        """Return the newest date whose combined multistream dump and index are published."""
+        def probe(date: str) -> bool:
+            jobs = (self.get_dumpstatus(date) or {}).get("jobs", {})
+            # Split wikis (enwiki) produce per-part files in articlesmultistreamdump and only
+            # get the combined files download_dump fetches from the later recombine job,
+            # so look for the job that actually lists those files
+            base_filename = f"{self.wiki_lang}-{date}-{self.dump_type}"
+            wanted = {f"{base_filename}.xml.bz2", f"{base_filename}-index.txt.bz2"}
+            for job in jobs.values():
+                if wanted <= set(job.get("files") or {}):
+                    return job.get("status") == "done"
+
+            job = jobs.get("articlesmultistreamdumprecombine") or jobs.get("articlesmultistreamdump") or {}
+            return job.get("status") == "done"
+
+        # Probe all candidates at once, then take the newest complete one
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            complete = dict(zip(dates, executor.map(probe, dates)))
+
+        return next((date for date in dates if complete[date]), None)
 
     def get_latest_dump_date(self) -> Optional[str]:
         """Get the latest completed Wikipedia dump date."""
         console.print("[blue]🔍 Checking for latest completed Wikipedia dump...[/blue]")
 
+        cache = self.load_dump_cache()
+        latest = cache.get("latest", {})
+        if latest.get("date") and not self.force_download:
+            age = time.time() - latest.get("last_checked", 0)
+            if age < LATEST_CHECK_TTL:
+                console.print(f"[green]✓[/green] Latest completed dump: {latest['date']} (checked {age / 60:.0f} min ago)")
+                return latest["date"]
+
         try:
-            # Get list of available dumps
-            response = requests.get(f"{self.dump_base_url}/", timeout=30)
-            response.raise_for_status()
+            # Get list of available dumps, letting the server answer 304 if it hasn't changed
+            headers = {"If-None-Match": latest["etag"]} if latest.get("etag") and latest.get("date") else {}
+            response = self.session.get(f"{self.dump_base_url}/", headers=headers, timeout=30)
+
+            if response.status_code == 304:
+                # Same listing: only dumps that were still running last time can have changed
+                date = self.find_latest_complete(latest.get("pending", [])) or latest["date"]
+                pending = [d for d in latest.get("pending", []) if d > date]
+                etag = latest["etag"]
+            else:
+                response.raise_for_status()
 
-            # Extract dates from directory listings
-            dates = re.findall(r'(\d{8})/', response.text)
-            dates = sorted(set(dates), reverse=True)
+                # Extract dates from directory listings
+                dates = re.findall(r'(\d{8})/', response.text)
+                dates = sorted(set(dates), reverse=True)[:DUMP_PROBE_LIMIT]
+                date = self.find_latest_complete(dates)
+                pending = [d for d in dates if date and d > date]
+                etag = response.headers.get("ETag")
 
-            # Find the first complete dump
-            for date in dates:
-                md5_url = f"{self.dump_base_url}/{date}/{self.wiki_lang}-{date}-md5sums.txt"
-                try:
-                    md5_response = requests.head(md5_url, timeout=10)
-                    if md5_response.status_code == 200:
-                        console.print(f"[green]✓[/green] Latest completed dump: {date}")
-                        return date
-                except requests.RequestException:
-                    continue
+            if not date:
+                console.print("[red]✗ Could not find a completed dump[/red]")
+                return None
 
-            console.print("[red]✗ Could not find a completed dump[/red]")
-            return None
+            cache["latest"] = {"date": date, "pending": pending, "etag": etag, "last_checked": time.time()}
+            self.save_dump_cache(cache)
+            console.print(f"[green]✓[/green] Latest completed dump: {date}")
+            return date
 
         except requests.RequestException as e:
             console.print(f"[red]✗ Error checking for dumps: {e}[/red]")
             return None
 
+    def get_dumpstatus(self, date: str) -> Optional[dict]:
+        """Fetch and memoize a dump's dumpstatus.json (None if unavailable)."""
+        if date not in self.dumpstatus_cache:
+            try:
+                response = self.session.get(f"{self.dump_base_url}/{date}/dumpstatus.json", timeout=10)
+                self.dumpstatus_cache[date] = response.json() if response.status_code == 200 else None
+            except (requests.RequestException, ValueError):
+                self.dumpstatus_cache[date] = None
+        return self.dumpstatus_cache[date]
+
     def get_current_dump_date(self) -> Optional[str]:
         """Get the date of the currently installed dump."""
-        # Check what dump files we have locally
-        pattern = f"{self.wiki_lang}-*-pages-articles*.xml*"
-        files = list(self.wiki_dir.glob(pattern))
-
-        if not files:
-            return None
-
-        # Extract dates from filenames
+        # Adding or removing files bumps the directory mtime, so an unchanged mtime means an unchanged answer
+        cache = self.load_dump_cache()
+        current = cache.get("current", {})
+        mtime_ns = os.stat(self.wiki_dir).st_mtime_ns
+        if current.get("wiki_dir") == str(self.wiki_dir) and current.get("mtime_ns") == mtime_ns:
+            return current.get("date")
+
+        # Check what dump files we have locally, matching on names only (no stat, no Path objects)
+        # Anchored so in-progress .partial downloads and aria2 control files don't count
+        dump_re = re.compile(rf'^{re.escape(self.wiki_lang)}-(\d{{8}})-pages-articles.*\.xml(?:\.bz2)?$')
         dates = []
-        for file in files:
-            match = re.search(r'(\d{8})', file.name)
-            if match:
-                dates.append(match.group(1))
-
-        return max(dates) if dates else None
+        with os.scandir(self.wiki_dir) as entries:
+            for entry in entries:
+                match = dump_re.match(entry.name)
+                if match:
+                    dates.append(match.group(1))
+
+        # YYYYMMDD strings sort chronologically
+        date = max(dates) if dates else None
+        cache["current"] = {"wiki_dir": str(self.wiki_dir), "mtime_ns": mtime_ns, "date": date}
+        self.save_dump_cache(cache)
+        return date
 
     def download_file(self, url: str, destination: Path, description: str) -> bool:
         """Download a file with progress bar."""
@@ -124,30 +428,30 @@ class WikiUpdater:
         try:
             console.print(f"[blue]⬇[/blue]  Downloading {description}...")
 
-            # Get file size
-            response = requests.head(url, timeout=10)
-            total_size = int(response.headers.get('content-length', 0))
-
-            # Download with progress bar
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                TextColumn("•"),
-                TextColumn("[cyan]{task.completed}/{task.total} MB[/cyan]"),
-                TimeRemainingColumn(),
-                console=console,
-            ) as progress:
-                task = progress.add_task(description, total=total_size // (1024 * 1024))
-
-                with requests.get(url, stream=True, timeout=(30, 300)) as r:
-                    r.raise_for_status()
+            with self.session.get(url, stream=True, timeout=(30, 300)) as r:
+                r.raise_for_status()
+                # Size comes from the GET itself, no separate HEAD round-trip
+                total_size = int(r.headers.get('content-length', 0))
+                r.raw.decode_content = True
+
+                # Download with progress bar
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    BarColumn(),
+                    TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                    TextColumn("•"),
+                    DownloadColumn(binary_units=True),
+                    TimeRemainingColumn(),
+                    console=console,
+                ) as progress:
+                    task = progress.add_task(description, total=total_size or None)
+
+                    # Read straight from the raw stream, skipping iter_content's re-chunking
                     with open(destination, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192 * 1024):  # 8MB chunks
-                            if chunk:
-                                f.write(chunk)
-                                progress.update(task, advance=len(chunk) // (1024 * 1024))
+                        while chunk := r.raw.read(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                            progress.update(task, advance=len(chunk))
 
             console.print(f"[green]✓[/green] Download complete: {description}")
             return True
@@ -158,6 +462,44 @@ class WikiUpdater:
                 destination.unlink()
             return False
 
+    def download_file_aria2(self, url: str, destination: Path, description: str) -> bool:
+        """Download a large file over several parallel range requests with aria2c."""
+        # Only a finished download is ever renamed to destination
+        if destination.exists() and not self.force_download:
+            console.print(f"[green]✓[/green] {description} already exists")
+            return True
+
+        # Download under a temporary name so a failed or interrupted run never leaves
+        # something that looks like a finished dump
+        partial = destination.with_name(destination.name + ".partial")
+
+        console.print(f"[blue]⬇[/blue]  Downloading {description} with aria2c...")
+        try:
+            subprocess.run(
+                [
+                    "aria2c",
+                    "-x", str(ARIA2_CONNECTIONS), "-s", str(ARIA2_CONNECTIONS), "-k", "10M",
+                    "--continue=true",
+                    f"--allow-overwrite={'true' if self.force_download else 'false'}",
+                    "--file-allocation=falloc",
+                    "--console-log-level=warn",
+                    "--summary-interval=0",
+                    "-d", str(destination.parent),
+                    "-o", partial.name,
+                    url,
+                ],
+                check=True
+            )
+        except subprocess.CalledProcessError as e:
+            # Leave the .partial file and its .aria2 control file so the next run resumes
+            console.print(f"[red]✗ Download failed: {e}[/red]")
+            return False
+
+        os.replace(partial, destination)
+
+        console.print(f"[green]✓[/green] Download complete: {description}")
+        return True
+
     def download_dump(self, dump_date: str) -> bool:
         """Download Wikipedia dump files."""
         base_filename = f"{self.wiki_lang}-{dump_date}-{self.dump_type}"
@@ -165,7 +507,9 @@ class WikiUpdater:
         # Download multistream XML
         xml_file = self.wiki_dir / f"{base_filename}.xml.bz2"
         xml_url = f"{self.dump_base_url}/{dump_date}/{base_filename}.xml.bz2"
-        if not self.download_file(xml_url, xml_file, "Wikipedia dump"):
+        # The dump is the one file big enough to benefit from multiple connections
+        download = self.download_file_aria2 if shutil.which("aria2c") else self.download_file
+        if not download(xml_url, xml_file, "Wikipedia dump"):
             return False
 
         # Download multistream index
@@ -192,46 +536,50 @@ class WikiUpdater:
         console.print("[blue]🔐 Verifying checksums...[/blue]")
 
         try:
-            # Read relevant checksums
-            with open(md5_file) as f:
-                checksums = f.read()
-
+            # Stream md5sums.txt once, keeping only the files we downloaded
+            # Lines look like "<hex>  <filename>"
             base_filename = f"{self.wiki_lang}-{dump_date}-{self.dump_type}"
-            relevant_lines = [
-                line for line in checksums.splitlines()
-                if f"{base_filename}.xml.bz2" in line or f"{base_filename}-index.txt.bz2" in line
-            ]
+            wanted = {f"{base_filename}.xml.bz2", f"{base_filename}-index.txt.bz2"}
+            expected = {}
+            with open(md5_file) as f:
+                for line in f:
+                    md5, _, name = line.strip().partition("  ")
+                    name = name.lstrip("*")
+                    if name in wanted:
+                        expected[name] = md5
 
-            if not relevant_lines:
+            if not expected:
                 console.print("[yellow]⚠[/yellow]  No checksums found for downloaded files")
                 return True
 
-            # Write temporary checksum file
-            temp_md5 = Path("/tmp/wikiupdate-verify.md5")
-            temp_md5.write_text('\n'.join(relevant_lines))
-
-            try:
-                result = subprocess.run(
-                    ["md5sum", "-c", str(temp_md5)],
-                    cwd=self.wiki_dir,
-                    capture_output=True,
-                    text=True
-                )
+            # Hash both files in-process and in parallel; hashlib releases the GIL on large buffers
+            paths = [self.wiki_dir / name for name in expected]
+            with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+                digests = dict(zip(expected, executor.map(file_md5, paths)))
 
-                if "FAILED" in result.stdout or result.returncode != 0:
-                    console.print("[red]✗ Checksum verification failed![/red]")
-                    return False
+            failed = [name for name, md5 in expected.items() if digests[name] != md5]
+            if failed:
+                console.print(f"[red]✗ Checksum verification failed! ({', '.join(failed)})[/red]")
+                return False
 
-                console.print("[green]✓[/green] Checksum verification passed")
-                return True
-            finally:
-                if temp_md5.exists():
-                    temp_md5.unlink()
+            console.print("[green]✓[/green] Checksum verification passed")
+            return True
 
         except Exception as e:
             console.print(f"[yellow]⚠[/yellow]  Checksum verification error: {e}")
             return True  # Don't fail the whole process
 
+    def bzip2_decompress_cmd(self, mode: str) -> list[str]:
+        """Build a bzip2 decompress command, preferring multi-core lbzip2/pbzip2 over bunzip2.
+
+        mode is "-c" to write to stdout or "-k" to decompress next to the input and keep it.
+        """
+        if shutil.which("lbzip2"):
+            return ["lbzip2", "-d", mode, "-n", str(self.parallel_jobs)]
+        if shutil.which("pbzip2"):
+            return ["pbzip2", "-d", mode, f"-p{self.parallel_jobs}"]
+        return ["bunzip2", mode]
+
     def decompress_index(self, dump_date: str) -> bool:
         """Decompress the index file."""
         base_filename = f"{self.wiki_lang}-{dump_date}-{self.dump_type}"
@@ -244,11 +592,20 @@ class WikiUpdater:
 
         console.print("[blue]📦 Decompressing index...[/blue]")
 
+        if not shutil.which("lbzip2") and not shutil.which("pbzip2"):
+            try:
+                import indexed_bzip2
+            except ImportError:
+                pass
+            else:
+                return self.decompress_index_in_process(indexed_bzip2, index_bz2, index_txt)
+
         try:
             subprocess.run(
-                ["bunzip2", "-k", str(index_bz2)],
+                self.bzip2_decompress_cmd("-k") + [str(index_bz2)],
                 check=True,
-                capture_output=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
             )
             console.print("[green]✓[/green] Index decompressed")
             return True
@@ -256,8 +613,59 @@ class WikiUpdater:
             console.print(f"[red]✗ Decompression failed: {e}[/red]")
             return False
 
+    def decompress_index_in_process(self, indexed_bzip2, index_bz2: Path, index_txt: Path) -> bool:
+        """Decompress the index with indexed_bzip2, which decodes bz2 blocks on a thread pool."""
+        partial = index_txt.with_name(index_txt.name + ".partial")
+        try:
+            with indexed_bzip2.open(str(index_bz2), parallelization=self.parallel_jobs) as src, \
+                    open(partial, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 4 * 1024 * 1024)
+            os.replace(partial, index_txt)
+            console.print("[green]✓[/green] Index decompressed")
+            return True
+        except Exception as e:
+            partial.unlink(missing_ok=True)
+            console.print(f"[red]✗ Decompression failed: {e}[/red]")
+            return False
+
+    def ensure_sudo(self) -> bool:
+        """Check (once per run) that the sudo docker commands won't stop for a password."""
+        if self.sudo_ok is None:
+            if os.geteuid() == 0:
+                self.sudo_ok = True
+            else:
+                try:
+                    subprocess.run(["sudo", "-n", "true"], check=True, capture_output=True)
+                    self.sudo_ok = True
+                except (subprocess.CalledProcessError, FileNotFoundError):
+                    self.sudo_ok = False
+
+        if not self.sudo_ok:
+            console.print("[red]✗ This tool requires sudo access[/red]")
+            console.print("[yellow]Please run with sudo or ensure your user has passwordless sudo[/yellow]")
+        return self.sudo_ok
+
     def check_docker_running(self) -> bool:
-        """Check if MediaWiki Docker containers are running."""
+        """Check if MediaWiki Docker containers are running (cached for this run)."""
+        if self.docker_running is None:
+            self.docker_running = self.query_docker_running()
+        return self.docker_running
+
+    def query_docker_running(self) -> bool:
+        """Ask the Docker API socket for the container, falling back to docker compose ps."""
+        try:
+            conn = UnixHTTPConnection(DOCKER_SOCKET)
+            try:
+                filters = urllib.parse.quote(json.dumps({"name": ["mw_app"]}))
+                conn.request("GET", f"/containers/json?filters={filters}")
+                response = conn.getresponse()
+                if response.status == 200:
+                    return any(c.get("State") == "running" for c in json.loads(response.read()))
+            finally:
+                conn.close()
+        except OSError:
+            pass  # Socket missing or not readable without sudo
+
         try:
             result = subprocess.run(
                 ["sudo", "docker", "compose", "ps"],
@@ -270,6 +678,28 @@ class WikiUpdater:
         except subprocess.CalledProcessError:
             return False
 
+    def wait_for_db(self, compose_file: Path, timeout: float = 60) -> bool:
+        """Poll the database's published port until MariaDB sends its handshake."""
+        address = get_db_host_port(compose_file)
+        if address is None:
+            # Nothing published on the host to probe; fall back to a fixed wait
+            time.sleep(10)
+            return True
+
+        # docker-proxy accepts on the host port as soon as the container starts, so a
+        # connect alone proves nothing; only a server that's actually up sends a greeting
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(address, timeout=1) as sock:
+                    sock.settimeout(max(1.0, deadline - time.monotonic()))
+                    if sock.recv(4):
+                        return True
+            except OSError:
+                pass
+            time.sleep(0.25)
+        return False
+
     def scale_up_resources(self) -> bool:
         """Scale up MariaDB resources for import (aggressive tuning)."""
         console.print("[blue]⚙[/blue]  Scaling up database resources for import...")
@@ -282,22 +712,11 @@ class WikiUpdater:
 
         try:
             # Backup files
-            subprocess.run(["cp", str(compose_file), str(compose_backup)], check=True)
-            subprocess.run(["cp", str(tuning_file), str(tuning_backup)], check=True)
-
-            # Update docker-compose.yml with aggressive settings
-            with open(compose_file, 'r') as f:
-                content = f.read()
-
-            # Replace the command line with aggressive import settings
-            content = re.sub(
-                r'command: \["--innodb-buffer-pool-size=[^"]+", "--max-connections=[^"]+", "--innodb-io-capacity=[^"]+", "--innodb-io-capacity-max=[^"]+"\]',
-                'command: ["--innodb-buffer-pool-size=16G", "--max-connections=200", "--innodb-io-capacity=4000", "--innodb-io-capacity-max=8000"]',
-                content
-            )
+            backup_file(compose_file, compose_backup)
+            backup_file(tuning_file, tuning_backup)
 
-            with open(compose_file, 'w') as f:
-                f.write(content)
+            # Update docker-compose.yml with aggressive import settings
+            set_db_command(compose_file, IMPORT_DB_COMMAND)
 
             # Update 99-tuning.cnf with aggressive settings
             aggressive_config = """[mysqld]
@@ -313,8 +732,7 @@ skip_log_bin=1
 max_heap_table_size = 2G
 tmp_table_size = 2G
 """
-            with open(tuning_file, 'w') as f:
-                f.write(aggressive_config)
+            write_text_atomic(tuning_file, aggressive_config)
 
             # Restart database with new settings
             console.print("[blue]⚙[/blue]  Restarting database with aggressive settings...")
@@ -322,12 +740,13 @@ tmp_table_size = 2G
                 ["sudo", "docker", "compose", "restart", "db"],
                 cwd=self.wiki_dir,
                 check=True,
-                capture_output=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
             )
 
             # Wait for database to be ready
-            import time
-            time.sleep(10)
+            if not self.wait_for_db(compose_file):
+                console.print("[yellow]⚠ Database did not accept connections in time, continuing anyway...[/yellow]")
 
             console.print("[green]✓[/green] Resources scaled up for import")
             console.print("[yellow]  - Buffer pool: 16G[/yellow]")
@@ -341,8 +760,8 @@ tmp_table_size = 2G
             console.print(f"[red]✗ Failed to scale up resources: {e}[/red]")
             # Attempt to restore backups
             try:
-                subprocess.run(["cp", str(compose_backup), str(compose_file)], check=True)
-                subprocess.run(["cp", str(tuning_backup), str(tuning_file)], check=True)
+                restore_file(compose_backup, compose_file)
+                restore_file(tuning_backup, tuning_file)
             except Exception:
                 pass
             return False
@@ -364,17 +783,7 @@ tmp_table_size = 2G
                 tuning_file = self.wiki_dir / "mariadb-conf" / "99-tuning.cnf"
 
                 # Update compose file with normal settings
-                with open(compose_file, 'r') as f:
-                    content = f.read()
-
-                content = re.sub(
-                    r'command: \["--innodb-buffer-pool-size=[^"]+", "--max-connections=[^"]+", "--innodb-io-capacity=[^"]+", "--innodb-io-capacity-max=[^"]+"\]',
-                    'command: ["--innodb-buffer-pool-size=2G", "--max-connections=50", "--innodb-io-capacity=1000", "--innodb-io-capacity-max=2000"]',
-                    content
-                )
-
-                with open(compose_file, 'w') as f:
-                    f.write(content)
+                set_db_command(compose_file, NORMAL_DB_COMMAND)
 
                 # Write normal tuning config
                 normal_config = """[mysqld]
@@ -389,19 +798,15 @@ skip_log_bin=1
 max_heap_table_size = 512M
 tmp_table_size = 512M
 """
-                with open(tuning_file, 'w') as f:
-                    f.write(normal_config)
+                write_text_atomic(tuning_file, normal_config)
             else:
                 # Restore from backups
                 compose_file = self.wiki_dir / "docker-compose.yml"
                 tuning_file = self.wiki_dir / "mariadb-conf" / "99-tuning.cnf"
 
-                subprocess.run(["cp", str(compose_backup), str(compose_file)], check=True)
-                subprocess.run(["cp", str(tuning_backup), str(tuning_file)], check=True)
-
-                # Remove backup files
-                compose_backup.unlink()
-                tuning_backup.unlink()
+                # Renaming the backups into place also removes them
+                restore_file(compose_backup, compose_file)
+                restore_file(tuning_backup, tuning_file)
 
             # Restart database with normal settings
             console.print("[blue]⚙[/blue]  Restarting database with normal settings...")
@@ -409,7 +814,8 @@ tmp_table_size = 512M
                 ["sudo", "docker", "compose", "restart", "db"],
                 cwd=self.wiki_dir,
                 check=True,
-                capture_output=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
             )
 
             console.print("[green]✓[/green] Resources restored to normal operation")
@@ -429,30 +835,31 @@ tmp_table_size = 512M
         base_filename = f"{self.wiki_lang}-{dump_date}-{self.dump_type}"
         index_file = self.wiki_dir / f"{base_filename}-index.txt"
 
+        # The count never changes for a given dump, so reuse it across runs/resumes
+        self.page_counts = self.load_progress().get("page_counts", {})
+        if dump_date in self.page_counts:
+            line_count = self.page_counts[dump_date]
+            console.print(f"[dim]Index file shows {line_count:,} pages (cached)[/dim]")
+            return line_count
+
         if index_file.exists():
             try:
                 console.print("[dim]Counting pages from index file...[/dim]")
-                result = subprocess.run(
-                    ["wc", "-l", str(index_file)],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                line_count = int(result.stdout.split()[0])
+                line_count = 0
+                with open(index_file, 'rb') as f:
+                    while block := f.read(DOWNLOAD_CHUNK_SIZE):
+                        line_count += block.count(b"\n")
                 # Each index entry represents a page
                 console.print(f"[dim]Index file shows {line_count:,} pages[/dim]")
+                self.page_counts = {dump_date: line_count}
                 return line_count
             except Exception as e:
                 console.print(f"[yellow]⚠ Could not count index file: {e}[/yellow]")
 
         # Fallback: Try to get from WikiMedia API
         try:
-            response = requests.get(
-                f"{self.dump_base_url}/{dump_date}/dumpstatus.json",
-                timeout=10
-            )
-            if response.status_code == 200:
-                data = response.json()
+            data = self.get_dumpstatus(dump_date)
+            if data:
                 # Look for page count in metadata
                 for job_name, job_data in data.get("jobs", {}).items():
                     if "articles" in job_name.lower():
@@ -474,6 +881,22 @@ tmp_table_size = 512M
         console.print("[yellow]⚠ Using fallback estimate of 25M pages[/yellow]")
         return 25000000  # ~25M total pages for English Wikipedia multistream
 
+    def has_room_for_xml_copy(self, xml_bz2: Path) -> bool:
+        """Whether wiki_dir can hold the decompressed dump and still leave MariaDB room to grow."""
+        try:
+            needed = xml_bz2.stat().st_size * XML_EXPANSION_RATIO + XML_COPY_HEADROOM
+            st = os.statvfs(self.wiki_dir)
+            free = st.f_bavail * st.f_frsize
+        except OSError:
+            return False
+        if free < needed:
+            console.print(
+                f"[yellow]⚠ Not keeping a decompressed copy of the dump: {format_size(free)} free, "
+                f"~{format_size(needed)} needed. A retry will decompress again.[/yellow]"
+            )
+            return False
+        return True
+
     def import_dump(self, dump_date: str) -> bool:
         """Import Wikipedia dump into MediaWiki."""
         if not self.check_docker_running():
@@ -487,6 +910,8 @@ tmp_table_size = 512M
 
         base_filename = f"{self.wiki_lang}-{dump_date}-{self.dump_type}"
         xml_bz2 = self.wiki_dir / f"{base_filename}.xml.bz2"
+        xml_txt = self.wiki_dir / f"{base_filename}.xml"
+        xml_partial = self.wiki_dir / f"{base_filename}.xml.partial"
         log_file = self.wiki_dir / f"import_{dump_date}.log"
 
         # Get estimated total pages
@@ -509,7 +934,8 @@ tmp_table_size = 512M
 
         try:
             # Build the import pipeline
-            bunzip2_cmd = ["bunzip2", "-c", str(xml_bz2)]
+            # The decompressor reads the archive from stdin so we hold the fd for fadvise
+            bunzip2_cmd = self.bzip2_decompress_cmd("-c")
             import_cmd = [
                 "sudo", "docker", "compose", "exec", "-T", "mediawiki",
                 "php", "maintenance/importDump.php",
@@ -518,30 +944,64 @@ tmp_table_size = 512M
                 "--report=1000"
             ]
 
-            with open(log_file, 'w') as log_f:
-                bunzip2_proc = subprocess.Popen(
-                    bunzip2_cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    bufsize=0
-                )
+            # importDump output is handled as raw bytes; only progress lines are ever parsed
+            with open(log_file, 'wb') as log_f:
+                if xml_txt.exists():
+                    # A previous run already decompressed the whole dump; feed it straight in
+                    console.print(f"[green]✓[/green] Reusing decompressed dump: {xml_txt.name}")
+                    source_fd = os.open(xml_txt, os.O_RDONLY)
+                    fadvise(source_fd, "POSIX_FADV_SEQUENTIAL")
+                    bunzip2_proc = None
+                    tee_proc = None
+                    partial_fd = None
+                    import_stdin = source_fd
+                else:
+                    # Read-once input: hint sequential access so it doesn't crowd MariaDB out of the page cache
+                    source_fd = os.open(xml_bz2, os.O_RDONLY)
+                    fadvise(source_fd, "POSIX_FADV_SEQUENTIAL")
+                    bunzip2_proc = subprocess.Popen(
+                        bunzip2_cmd,
+                        stdin=source_fd,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        bufsize=0
+                    )
+                    if self.has_room_for_xml_copy(xml_bz2):
+                        # Keep a decompressed copy so a retry can skip bzip2 entirely; our own
+                        # fd on the same file lets the reporter flush and evict what tee wrote
+                        partial_fd = os.open(xml_partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                        tee_proc = subprocess.Popen(
+                            ["tee", str(xml_partial)],
+                            stdin=bunzip2_proc.stdout,
+                            stdout=subprocess.PIPE
+                        )
+                        if bunzip2_proc.stdout:
+                            bunzip2_proc.stdout.close()
+                        import_stdin = tee_proc.stdout
+                    else:
+                        tee_proc = None
+                        partial_fd = None
+                        import_stdin = bunzip2_proc.stdout
 
                 import_proc = subprocess.Popen(
                     import_cmd,
-                    stdin=bunzip2_proc.stdout,
+                    stdin=import_stdin,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
+                    bufsize=1024 * 1024,
                     cwd=self.wiki_dir
                 )
 
-                if bunzip2_proc.stdout:
+                if tee_proc and tee_proc.stdout:
+                    tee_proc.stdout.close()
+                elif bunzip2_proc and bunzip2_proc.stdout:
                     bunzip2_proc.stdout.close()
 
-                pages_count = 0
-                last_progress_update = datetime.now()
+                # The reader loop only records the latest (pages, rate); a background
+                # thread does the rendering and periodic saves off the hot path
+                latest = {"progress": (0, 0.0)}
                 start_time = datetime.now()
+                done = threading.Event()
 
                 # Create progress bar
                 with Progress(
@@ -563,53 +1023,101 @@ tmp_table_size = 512M
                         rate=0.0
                     )
 
+                    def save_importing():
+                        """Save the latest page count as an in-progress import."""
+                        pages, rate = latest["progress"]
+                        now = datetime.now()
+                        elapsed = (now - start_time).total_seconds()
+                        avg_rate = pages / elapsed if elapsed > 0 else 0
+
+                        self.save_progress({
+                            "status": "importing",
+                            "dump_date": dump_date,
+                            "started_at": start_time.isoformat(),
+                            "last_update": now.isoformat(),
+                            "pages_imported": pages,
+                            "estimated_total": estimated_total,
+                            "progress_percent": (pages / estimated_total * 100) if estimated_total > 0 else 0,
+                            "avg_rate": avg_rate,
+                            "current_rate": rate,
+                            "log_file": str(log_file)
+                        })
+
+                    def report_progress():
+                        """Refresh the bar every second and save progress every 30 seconds."""
+                        last_save = time.monotonic()
+                        while not done.wait(1.0):
+                            pages, rate = latest["progress"]
+                            progress.update(task, completed=pages, rate=rate)
+
+                            if time.monotonic() - last_save >= 30:
+                                save_importing()
+                                last_save = time.monotonic()
+                                # Drop the already-consumed part of the input from the page cache
+                                fadvise(source_fd, "POSIX_FADV_DONTNEED")
+                                if partial_fd is not None:
+                                    # Dirty pages can't be dropped, so write the copy out first
+                                    try:
+                                        os.fdatasync(partial_fd)
+                                    except OSError:
+                                        pass
+                                    fadvise(partial_fd, "POSIX_FADV_DONTNEED")
+
+                    def handle_sigterm(signum, frame):
+                        raise SystemExit(128 + signum)
+
+                    reporter = threading.Thread(target=report_progress, daemon=True)
+                    reporter.start()
+
                     if import_proc.stdout:
+                        previous_sigterm = signal.signal(signal.SIGTERM, handle_sigterm)
                         try:
                             for line in import_proc.stdout:
                                 log_f.write(line)
-                                log_f.flush()
 
                                 # Parse progress from importDump output
                                 # Format: "1000 (202.14 pages/sec 202.14 revs/sec)"
-                                match = re.match(r'^(\d+)\s+\(([\d.]+)\s+pages/sec', line)
+                                # Most lines are log noise; only digit-led lines can match
+                                if not line[:1].isdigit():
+                                    continue
+                                match = PROGRESS_RE.match(line)
                                 if match:
-                                    pages_count = int(match.group(1))
-                                    current_rate = float(match.group(2))
-
-                                    # Update progress bar
-                                    progress.update(
-                                        task,
-                                        completed=pages_count,
-                                        rate=current_rate
-                                    )
-
-                                    # Save progress periodically
-                                    now = datetime.now()
-                                    if (now - last_progress_update).seconds >= 30:
-                                        elapsed = (now - start_time).total_seconds()
-                                        avg_rate = pages_count / elapsed if elapsed > 0 else 0
-
-                                        self.save_progress({
-                                            "status": "importing",
-                                            "dump_date": dump_date,
-                                            "started_at": start_time.isoformat(),
-                                            "last_update": now.isoformat(),
-                                            "pages_imported": pages_count,
-                                            "estimated_total": estimated_total,
-                                            "progress_percent": (pages_count / estimated_total * 100) if estimated_total > 0 else 0,
-                                            "avg_rate": avg_rate,
-                                            "current_rate": current_rate,
-                                            "log_file": str(log_file)
-                                        })
-                                        last_progress_update = now
-
+                                    latest["progress"] = (int(match.group(1)), float(match.group(2)))
+                                    # Flush per report rather than per line; a tail of the log
+                                    # stays at most one report behind
+                                    log_f.flush()
+
+                        except (KeyboardInterrupt, SystemExit):
+                            # Interrupted or killed: record the count reached, not the one from the last 30 s save
+                            done.set()
+                            reporter.join()
+                            save_importing()
+                            raise
                         except Exception as e:
                             console.print(f"\n[yellow]⚠ Stream reading error: {e}[/yellow]")
+                        finally:
+                            signal.signal(signal.SIGTERM, previous_sigterm)
                     else:
                         console.print("\n[red]✗ Failed to capture import output[/red]")
 
+                    done.set()
+                    reporter.join()
+                    pages_count, current_rate = latest["progress"]
+                    progress.update(task, completed=pages_count, rate=current_rate)
+
                     import_returncode = import_proc.wait()
-                    bunzip2_returncode = bunzip2_proc.wait()
+                    bunzip2_returncode = bunzip2_proc.wait() if bunzip2_proc else 0
+                    tee_returncode = tee_proc.wait() if tee_proc else 0
+
+                fadvise(source_fd, "POSIX_FADV_DONTNEED")
+                os.close(source_fd)
+                if partial_fd is not None:
+                    fadvise(partial_fd, "POSIX_FADV_DONTNEED")
+                    os.close(partial_fd)
+
+                # Only a fully written copy is promoted to the name retries look for
+                if tee_proc and bunzip2_returncode == 0 and tee_returncode == 0:
+                    xml_partial.replace(xml_txt)
 
                 if bunzip2_returncode != 0:
                     bunzip2_stderr = bunzip2_proc.stderr.read() if bunzip2_proc.stderr else b""
@@ -639,6 +1147,9 @@ tmp_table_size = 512M
                     console.print(f"[green]  Time elapsed:[/green] {elapsed/3600:.1f} hours")
                     console.print(f"[green]  Average rate:[/green] {avg_rate:.0f} pages/sec")
 
+                    # The decompressed copy only exists to speed up retries
+                    xml_txt.unlink(missing_ok=True)
+
                     # Scale down resources after successful import
                     self.scale_down_resources()
                     return True
@@ -682,35 +1193,63 @@ tmp_table_size = 512M
         console.print("\n[bold blue]Rebuilding indexes and caches...[/bold blue]")
 
         steps = [
-            ("Rebuilding recent changes", ["php", "maintenance/rebuildrecentchanges.php"], False),  # Optional - can fail
-            ("Rebuilding all indexes", ["php", "maintenance/rebuildall.php"], True),  # Required
-            ("Running maintenance jobs", ["php", "maintenance/runJobs.php"], True),  # Required
+            ("Rebuilding recent changes", "php maintenance/rebuildrecentchanges.php", False),  # Optional - can fail
+            ("Rebuilding all indexes", "php maintenance/rebuildall.php", True),  # Required
+            ("Running maintenance jobs", "php maintenance/runJobs.php", True),  # Required
         ]
 
-        failed_steps = []
-        for description, cmd, required in steps:
-            console.print(f"[blue]⚙[/blue]  {description}...")
-            try:
-                result = subprocess.run(
-                    ["sudo", "docker", "compose", "exec", "-T", "mediawiki"] + cmd,
-                    cwd=self.wiki_dir,
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-                console.print(f"[green]✓[/green] {description} complete")
-            except subprocess.CalledProcessError as e:
-                console.print(f"[red]✗ {description} failed: {e}[/red]")
-                if e.stderr:
-                    console.print(f"[red]Error output:[/red]\n{e.stderr}")
-                if e.stdout:
-                    console.print(f"[yellow]Command output:[/yellow]\n{e.stdout}")
-
-                if required:
-                    return False
+        # Run every step in a single exec so docker and the container attach are only paid once;
+        # marker lines report which step is running and how it exited
+        script = []
+        for index, (_, cmd, required) in enumerate(steps):
+            script.append(f'echo "{STEP_MARKER} {index}"; {cmd}; rc=$?; echo "{STATUS_MARKER} {index} $rc"')
+            if required:
+                script.append('[ "$rc" -eq 0 ] || exit "$rc"')
+
+        # Full output goes to a log file; only the tail of each step is kept for error reports
+        log_file = self.wiki_dir / "rebuild_indexes.log"
+        console.print(f"[cyan]Log file:[/cyan] {log_file}")
+        with open(log_file, 'w') as log_f:
+            proc = subprocess.Popen(
+                ["sudo", "docker", "compose", "exec", "-T", "mediawiki", "sh", "-c", "\n".join(script)],
+                cwd=self.wiki_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True
+            )
+
+            failed_steps = []
+            step_output = deque(maxlen=REBUILD_OUTPUT_TAIL)
+            step_failed = False
+            for line in proc.stdout:
+                log_f.write(line)
+                if line.startswith(STEP_MARKER):
+                    description = steps[int(line.split()[1])][0]
+                    console.print(f"[blue]⚙[/blue]  {description}...")
+                    step_output.clear()
+                elif line.startswith(STATUS_MARKER):
+                    _, index, rc = line.split()
+                    description, _, required = steps[int(index)]
+                    if rc == "0":
+                        console.print(f"[green]✓[/green] {description} complete")
+                        continue
+                    console.print(f"[red]✗ {description} failed with exit code {rc}[/red]")
+                    step_failed = True
+                    if step_output:
+                        console.print(f"[yellow]Command output:[/yellow]\n{''.join(step_output)}")
+                    if not required:
+                        console.print(f"[yellow]⚠[/yellow]  {description} is optional, continuing...")
+                        failed_steps.append(description)
                 else:
-                    console.print(f"[yellow]⚠[/yellow]  {description} is optional, continuing...")
-                    failed_steps.append(description)
+                    step_output.append(line)
+
+        if proc.wait() != 0:
+            if not step_failed:
+                # docker/sh itself failed before any step could report
+                console.print(f"[red]✗ Index rebuild failed with exit code {proc.returncode}[/red]")
+                if step_output:
+                    console.print(f"[yellow]Command output:[/yellow]\n{''.join(step_output)}")
+            return False
 
         if failed_steps:
             console.print(f"[yellow]⚠ Some optional steps failed: {', '.join(failed_steps)}[/yellow]")
@@ -721,25 +1260,27 @@ tmp_table_size = 512M
         """Remove old dump files, keeping only the specified date."""
         console.print(f"\n[blue]🧹 Cleaning up old dump files (keeping {keep_date})...[/blue]")
 
-        patterns = [
-            f"{self.wiki_lang}-*.xml",
-            f"{self.wiki_lang}-*.xml.bz2",
-            f"{self.wiki_lang}-*-index.txt",
-            f"{self.wiki_lang}-*-index.txt.bz2",
-            f"{self.wiki_lang}-*-md5sums.txt"
-        ]
-
-        for pattern in patterns:
-            for file in self.wiki_dir.glob(pattern):
-                if keep_date not in file.name:
-                    console.print(f"[dim]  Removing: {file.name}[/dim]")
-                    file.unlink()
+        # One directory pass classifies dump files and collects import logs
+        dump_prefix = f"{self.wiki_lang}-"
+        log_files = []
+        with os.scandir(self.wiki_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith(dump_prefix) and name.endswith(CLEANUP_SUFFIXES):
+                    if keep_date not in name:
+                        console.print(f"[dim]  Removing: {name}[/dim]")
+                        os.unlink(entry.path)
+                elif name.startswith("import_") and name.endswith(".log"):
+                    log_files.append((entry.stat(follow_symlinks=False).st_mtime, entry.path))
 
         # Remove old log files (keep last 5)
-        log_files = sorted(self.wiki_dir.glob("import_*.log"), key=lambda f: f.stat().st_mtime, reverse=True)
-        for log_file in log_files[5:]:
-            console.print(f"[dim]  Removing old log: {log_file.name}[/dim]")
-            log_file.unlink()
+        keep_logs = set(heapq.nlargest(5, log_files))
+        for log_file in log_files:
+            if log_file in keep_logs:
+                continue
+            log_path = log_file[1]
+            console.print(f"[dim]  Removing old log: {os.path.basename(log_path)}[/dim]")
+            os.unlink(log_path)
 
         console.print("[green]✓ Cleanup complete[/green]")
 
@@ -747,31 +1288,39 @@ tmp_table_size = 512M
         """Display disk space usage."""
         try:
             # Get filesystem usage
-            result = subprocess.run(
-                ["df", "-h", str(self.wiki_dir)],
-                capture_output=True,
-                text=True,
-                check=True
+            st = os.statvfs(self.wiki_dir)
+            total = st.f_blocks * st.f_frsize
+            free = st.f_bavail * st.f_frsize
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            console.print(
+                f"\n[bold]Disk Space:[/bold] {format_size(used)} used, "
+                f"{format_size(free)} free of {format_size(total)}"
             )
-            lines = result.stdout.strip().split('\n')
-            if len(lines) >= 2:
-                console.print(f"\n[bold]Disk Space:[/bold] {lines[1]}")
 
-            # Get directory size
-            result = subprocess.run(
-                ["du", "-sh", str(self.wiki_dir)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            size = result.stdout.split()[0]
-            console.print(f"[bold]MediaWiki Directory:[/bold] {size}")
+            # Get directory size, re-listing only directories changed since the last run
+            try:
+                cache = json.loads(DIRSIZE_CACHE_FILE.read_bytes())
+            except (OSError, ValueError):
+                cache = {}
+            visited = {}
+            size = dir_usage(str(self.wiki_dir.resolve()), cache, visited)
+            console.print(f"[bold]MediaWiki Directory:[/bold] {format_size(size)}")
+
+            try:
+                DIRSIZE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                write_text_atomic(DIRSIZE_CACHE_FILE, json.dumps(visited, separators=(',', ':')))
+            except OSError:
+                pass
 
         except Exception as e:
             console.print(f"[yellow]⚠ Could not get disk space: {e}[/yellow]")
 
     def run(self) -> int:
         """Main execution flow."""
+        # Only needed once the tool actually runs, not for --help or argument errors
+        from rich.prompt import Confirm
+        from rich.table import Table
+
         console.print("\n[bold cyan]═══════════════════════════════════════════════════════════[/bold cyan]")
         console.print("[bold cyan]           Wikipedia Dump Update Tool                  [/bold cyan]")
         console.print("[bold cyan]═══════════════════════════════════════════════════════════[/bold cyan]\n")
@@ -779,6 +1328,8 @@ tmp_table_size = 512M
         # Handle rebuild-indexes-only mode
         if self.rebuild_indexes_only:
             console.print("[bold blue]Running index rebuild only...[/bold blue]\n")
+            if not self.ensure_sudo():
+                return 1
             if not self.check_docker_running():
                 console.print("[red]✗ MediaWiki container is not running![/red]")
                 console.print(f"Start it with: cd {self.wiki_dir} && sudo docker compose up -d")
@@ -819,10 +1370,8 @@ tmp_table_size = 512M
         info_table.add_column("Key", style="cyan")
         info_table.add_column("Value", style="white")
 
-        cpu_count = subprocess.check_output(["nproc"], text=True).strip()
-
-        info_table.add_row("System", subprocess.check_output(["hostname"], text=True).strip())
-        info_table.add_row("CPU Cores", cpu_count)
+        info_table.add_row("System", socket.gethostname())
+        info_table.add_row("CPU Cores", str(os.cpu_count()))
         info_table.add_row("Parallel Jobs", str(self.parallel_jobs))
         info_table.add_row("MediaWiki Dir", str(self.wiki_dir))
 
@@ -872,32 +1421,38 @@ tmp_table_size = 512M
             skip_download = False
             latest_date_to_import = latest_date
 
+        # Only now is there docker work to do; up-to-date runs never touch sudo
+        if not self.ensure_sudo():
+            return 1
+
         if not skip_download:
             console.print(f"\n[bold green]Update available: {current_date or 'None'} → {latest_date}[/bold green]\n")
 
+            # Confirm up front so the download, verification and import can run unattended
+            console.print(f"[bold yellow]⚠  About to download and import Wikipedia dump dated {latest_date}[/bold yellow]")
+            console.print("[yellow]   This will add new revisions to all Wikipedia articles[/yellow]")
+            console.print("[yellow]   Estimated time: 4-12 hours depending on system performance, plus the download[/yellow]\n")
+
+            if not Confirm.ask("Continue with download and import?", default=False):
+                console.print("[yellow]Update cancelled by user[/yellow]")
+                return 0
+
             # Download
             if not self.download_dump(latest_date):
                 return 1
 
-            # Verify
-            if not self.verify_checksums(latest_date):
-                return 1
+            # Verify and decompress the index at the same time; both only read the
+            # downloaded files, and the hashing and lbzip2 each keep their own cores busy
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                decompressed = executor.submit(self.decompress_index, latest_date)
+                verified = self.verify_checksums(latest_date)
+                decompressed = decompressed.result()
 
-            # Decompress index
-            if not self.decompress_index(latest_date):
+            if not verified or not decompressed:
                 return 1
 
             self.show_disk_space()
 
-            # Confirm import
-            console.print(f"\n[bold yellow]⚠  About to import Wikipedia dump dated {latest_date}[/bold yellow]")
-            console.print("[yellow]   This will add new revisions to all Wikipedia articles[/yellow]")
-            console.print("[yellow]   Estimated time: 4-12 hours depending on system performance[/yellow]\n")
-
-            if not Confirm.ask("Continue with import?", default=False):
-                console.print("[yellow]Import cancelled by user[/yellow]")
-                return 0
-
         # Import (using latest_date_to_import which may be set from earlier)
         if not self.import_dump(latest_date_to_import):
             return 1
@@ -934,7 +1489,7 @@ def main():
 Examples:
   wikiupdate                      # Check for and install updates
   wikiupdate --force-download     # Re-download even if files exist
-  wikiupdate --parallel-jobs 12   # Use 12 parallel jobs (not yet implemented)
+  wikiupdate --parallel-jobs 12   # Decompress with 12 threads (needs lbzip2 or pbzip2)
   wikiupdate --rebuild-indexes-only # Only rebuild indexes (after import)
 
 Notes:
@@ -954,7 +1509,7 @@ Notes:
         "--parallel-jobs",
         type=int,
         default=8,
-        help="Number of parallel import jobs (default: 8, not yet implemented)"
+        help="Number of threads for bzip2 decompression when lbzip2 or pbzip2 is installed (default: 8)"
     )
 
     parser.add_argument(
@@ -965,14 +1520,6 @@ Notes:
 
     args = parser.parse_args()
 
-    # Check if running as root or with sudo access
-    try:
-        subprocess.run(["sudo", "-n", "true"], check=True, capture_output=True)
-    except subprocess.CalledProcessError:
-        console.print("[red]✗ This tool requires sudo access[/red]")
-        console.print("[yellow]Please run with sudo or ensure your user has passwordless sudo[/yellow]")
-        return 1
-
     # Create updater and run
     updater = WikiUpdater(
         wiki_dir=WIKI_DIR,
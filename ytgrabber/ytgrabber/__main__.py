@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import os
+import re
+import shutil
 import sys
 import subprocess
-import requests
-from datetime import datetime
-from mutagen.mp4 import MP4
-from openai import OpenAI
+from datetime import datetime, timezone
+from functools import lru_cache
+
+VIDEO_FIELDS = ["title", "upload_date", "release_date", "track", "location", "artist"]
+# GPT answers as "- Date: ...", sometimes bolded, reordered or wrapped in commentary
+METADATA_RE = re.compile(r"^\s*-?\s*\**(Date|Event|Location|Artist)\**\s*:\s*\**\s*(.+?)\s*$", re.M | re.I)
 
 def get_help():
     print("""
@@ -18,25 +23,52 @@ If the GPT call fails, it will prompt you for metadata manually.
 """)
     sys.exit(0)
 
+def parse_github_date(value):
+    # fromisoformat() only understands the trailing "Z" from Python 3.11
+    if sys.version_info >= (3, 11):
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+def save_update_state(update_check_path, release_date, etag):
+    with open(update_check_path, "w") as f:
+        json.dump({"published_at": release_date.isoformat(), "etag": etag}, f)
+
 def update_ytdlp(yt_dlp_path):
+    import requests
+
     os.makedirs(yt_dlp_path, exist_ok=True)
     bin_path = os.path.join(yt_dlp_path, "yt-dlp")
     update_check_path = os.path.join(yt_dlp_path, "last_update.txt")
 
     try:
         last_update = None
+        etag = None
         if os.path.exists(update_check_path):
             with open(update_check_path, "r") as f:
-                last_update = datetime.fromisoformat(f.read().strip())
+                saved = f.read().strip()
+            try:
+                state = json.loads(saved)
+                last_update = datetime.fromisoformat(state["published_at"])
+                etag = state.get("etag")
+            except ValueError:
+                # Older versions stored just the release date
+                last_update = datetime.fromisoformat(saved)
 
         print("Checking GitHub for latest yt-dlp release...")
-        headers = {"User-Agent": "Python"}
-        r = requests.get("https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest", headers=headers)
+        session = requests.Session()
+        session.headers.update({"User-Agent": "Python"})
+        headers = {"If-None-Match": etag} if etag and os.path.exists(bin_path) else {}
+        r = session.get("https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest", headers=headers)
+        if r.status_code == 304:
+            print("yt-dlp is already up to date.")
+            return
+        r.raise_for_status()
         release = r.json()
-        release_date = datetime.fromisoformat(release["published_at"].replace("Z", "+00:00"))
+        release_date = parse_github_date(release["published_at"])
 
-        if last_update and last_update >= release_date:
+        if last_update and last_update >= release_date and os.path.exists(bin_path):
             print("yt-dlp is already up to date.")
+            save_update_state(update_check_path, release_date, r.headers.get("ETag"))
             return
 
         asset = next((a for a in release["assets"] if a["name"] == "yt-dlp_linux"), None)
@@ -45,12 +77,15 @@ def update_ytdlp(yt_dlp_path):
             return
         url = asset["browser_download_url"]
         print(f"Downloading yt-dlp from {url}...")
-        data = requests.get(url, headers=headers).content
-        with open(bin_path, "wb") as f:
-            f.write(data)
-        os.chmod(bin_path, 0o755)
-        with open(update_check_path, "w") as f:
-            f.write(release_date.isoformat())
+        tmp_path = bin_path + ".tmp"
+        with session.get(url, stream=True) as dl, open(tmp_path, "wb") as f:
+            dl.raise_for_status()
+            dl.raw.decode_content = True
+            shutil.copyfileobj(dl.raw, f, length=1024 * 1024)
+        os.chmod(tmp_path, 0o755)
+        # Swap in atomically so an interrupted download never leaves a broken binary
+        os.replace(tmp_path, bin_path)
+        save_update_state(update_check_path, release_date, r.headers.get("ETag"))
         print("yt-dlp has been updated to latest release.")
 
     except Exception as e:
@@ -58,20 +93,40 @@ def update_ytdlp(yt_dlp_path):
 
 def get_video_title(binary, url):
     try:
-        title_result = subprocess.run([binary, "--get-title", url], stdout=subprocess.PIPE, check=True)
-        title = title_result.stdout.decode().strip()
-        date_result = subprocess.run([binary, "--print", "upload_date", url], stdout=subprocess.PIPE, check=True)
-        upload_date = date_result.stdout.decode().strip()
-        return title, upload_date
+        cmd = [binary, "--skip-download", "--no-warnings", "--quiet"]
+        for field in VIDEO_FIELDS:
+            cmd += ["--print", f"%({field})s"]
+        result = subprocess.run(cmd + [url], stdout=subprocess.PIPE, check=True)
+        lines = result.stdout.decode().splitlines()
+        if len(lines) < len(VIDEO_FIELDS):
+            raise ValueError("unexpected yt-dlp output")
+        info = {field: line.strip() for field, line in zip(VIDEO_FIELDS, lines)}
+        return info["title"], info["upload_date"], info
     except Exception as e:
         print(f"Error retrieving video title or upload date: {e}")
-        return None, None
+        return None, None, None
+
+def extract_metadata_from_ytdlp(info):
+    # Music uploads often carry structured fields; only use them when all are present
+    fields = [info[field] for field in ("release_date", "track", "location", "artist")]
+    if any(not value or value == "NA" for value in fields):
+        return None
+    release_date, track, location, artist = fields
+    if len(release_date) == 8 and release_date.isdigit():
+        release_date = f"{release_date[:4]}-{release_date[4:6]}-{release_date[6:]}"
+    return f"- Date: {release_date}\n- Event: {track}\n- Location: {location}\n- Artist: {artist}"
+
+@lru_cache(maxsize=1)
+def get_openai_client():
+    from openai import OpenAI
+
+    with open(os.path.expanduser("~/.openai_api_key")) as f:
+        api_key = f.read().strip()
+    return OpenAI(api_key=api_key)
 
 def extract_metadata_from_gpt(title, upload_date):
     try:
-        with open(os.path.expanduser("~/.openai_api_key")) as f:
-            api_key = f.read().strip()
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client()
 
         prompt = f"""
 You are a research assistant. Based on the YouTube video title and the known upload date below, perform a web search to determine the most likely real-world event (concert, performance, or show) the video is from.
@@ -101,6 +156,8 @@ If you can't find reliable info, respond with \"Unknown\" for the field.
 
 def tag_file(path, artist, title, year):
     try:
+        from mutagen.mp4 import MP4
+
         audio = MP4(path)
         audio["©nam"] = [title]
         audio["©ART"] = [artist]
@@ -133,11 +190,15 @@ def main():
         print(f"yt-dlp not found at {yt_dlp_bin}")
         sys.exit(1)
 
-    title, upload_date = get_video_title(yt_dlp_bin, args.url)
+    title, upload_date, info = get_video_title(yt_dlp_bin, args.url)
     if not title or not upload_date:
         sys.exit(1)
 
-    metadata = extract_metadata_from_gpt(title, upload_date)
+    metadata = extract_metadata_from_ytdlp(info)
+    if metadata:
+        print("Using metadata provided by yt-dlp.")
+    else:
+        metadata = extract_metadata_from_gpt(title, upload_date)
 
     # Initialize variables
     event_date = ""
@@ -146,16 +207,17 @@ def main():
     artist_name = ""
 
     if metadata:
-        print("\nGPT Metadata Response:\n" + metadata)
-        try:
-            lines = metadata.splitlines()
-            event_date = lines[0].split(":", 1)[1].strip()
-            event_title = lines[1].split(":", 1)[1].strip()
-            event_location = lines[2].split(":", 1)[1].strip()
-            artist_name = lines[3].split(":", 1)[1].strip()
-        except Exception as e:
-            print(f"Metadata parse failed: {e}")
+        print("\nMetadata:\n" + metadata)
+        fields = {m.group(1).lower(): m.group(2) for m in METADATA_RE.finditer(metadata)}
+        missing = [name for name in ("date", "event", "location", "artist") if name not in fields]
+        if missing:
+            print(f"Metadata parse failed: missing {', '.join(missing)}")
             metadata = None
+        else:
+            event_date = fields["date"]
+            event_title = fields["event"]
+            event_location = fields["location"]
+            artist_name = fields["artist"]
 
     if not metadata:
         print("Falling back to manual entry:")